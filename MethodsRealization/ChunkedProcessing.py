@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+
+from MethodsRealization.Normalization import Normalization
+
+
+class ChunkedProcessing:
+    # Обработка таблицы критериев по частям (блокам альтернатив) в два прохода:
+    # первый собирает минимум и максимум каждого критерия, второй меняет направление, нормализует и ограничивает блоки
+    def __init__(self, blocks, normalization_methods, direcion_settings, zero_range='zero', absolute_floor=False):
+        self.blocks = blocks                # Функция без аргументов, возвращающая новый итератор блоков (DataFrame критерии x альтернативы)
+        self.normalization_methods = normalization_methods
+        self.direcion_settings = direcion_settings
+        self.zero_range = zero_range
+        self.absolute_floor = absolute_floor
+        self.statistics = None
+
+    """Источники блоков"""
+    @staticmethod
+    def csv_blocks(path, block_size, **read_csv_params):
+        # В файле строки - альтернативы, столбцы - критерии, первый столбец - названия альтернатив
+        return lambda: (chunk.T for chunk in pd.read_csv(path, index_col=0, chunksize=block_size, **read_csv_params))
+
+    @staticmethod
+    def npy_blocks(path, criteria, block_size, alternatives=None):
+        # Массив критерии x альтернативы, файл отображается в память и читается по столбцам
+        def blocks():
+            values = np.load(path, mmap_mode='r')
+            for start in range(0, values.shape[1], block_size):
+                end = min(start + block_size, values.shape[1])
+                columns = alternatives[start:end] if alternatives is not None else range(start, end)
+                yield pd.DataFrame(np.asarray(values[:, start:end], dtype=float), index=criteria, columns=columns)
+        return blocks
+
+    """Первый проход"""
+    def __direction_changing__(self, values, criteria, max_values):
+        direction_changes = self.direcion_settings['direction_changes']
+        savige_max_value = self.direcion_settings['savige_max_values']
+
+        for i, criterion in enumerate(criteria):
+            if criterion not in direction_changes:
+                continue
+            row = values[i]
+            if direction_changes[criterion] == 'negation':
+                np.negative(row, out=row)
+            elif direction_changes[criterion] == 'savige':
+                np.subtract(max_values[i] if savige_max_value[criterion] is None else savige_max_value[criterion], row, out=row)
+            else:
+                raise ValueError("Некорректный способ смены направления")
+
+        return values
+
+    def __statistics__(self):
+        criteria = None
+        min_value = max_value = None
+        for block in self.blocks():
+            if criteria is None:
+                criteria = block.index
+                min_value = np.full(len(criteria), np.inf)
+                max_value = np.full(len(criteria), -np.inf)
+            values = block.loc[criteria].to_numpy(dtype=float)
+            np.minimum(min_value, values.min(axis=1), out=min_value)
+            np.maximum(max_value, values.max(axis=1), out=max_value)
+
+        if criteria is None:
+            raise ValueError("Нет данных для обработки")
+
+        raw_max = max_value.copy()
+        methods = [self.normalization_methods[criterion] for criterion in criteria]
+        min_value, max_value, normalized_max = Normalization.bounds_statistics(
+            min_value, max_value, methods,
+            direction_changing=lambda bounds: self.__direction_changing__(bounds, criteria, raw_max),
+            zero_range=self.zero_range
+        )
+
+        self.statistics = {
+            'criteria': criteria,
+            'raw_max': raw_max,
+            'min': min_value,
+            'max': max_value,
+            'normalized_max': normalized_max,
+            'methods': methods
+        }
+        return self.statistics
+
+    """Второй проход"""
+    def get_processed_blocks(self):
+        statistics = self.__statistics__() if self.statistics is None else self.statistics
+        criteria = statistics['criteria']
+
+        for block in self.blocks():
+            values = np.array(block.loc[criteria], dtype=float)
+            self.__direction_changing__(values, criteria, statistics['raw_max'])
+            Normalization.normalize_rows(values, statistics['methods'], zero_range=self.zero_range, out=values, statistics=(statistics['min'], statistics['max']))
+            Normalization.floor(values, axis=1, absolute=self.absolute_floor, out=values, max_value=statistics['normalized_max'])
+            yield pd.DataFrame(values, index=criteria, columns=block.columns, copy=False)
+
+    def score(self, scorer):
+        # scorer - функция от обработанного блока, возвращающая оценки его альтернатив (Series)
+        return pd.concat([scorer(block) for block in self.get_processed_blocks()])
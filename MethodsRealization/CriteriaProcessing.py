@@ -1,17 +1,35 @@
 import numpy as np
 import pandas as pd
 from itertools import combinations
+from collections import OrderedDict
+from hashlib import blake2b
+
+from MethodsRealization.KemenyRanking import KemenyRanking
+from MethodsRealization.Normalization import Normalization
+from MethodsRealization.ChunkedProcessing import ChunkedProcessing
 
 class CriteriaProcessing:
+    natural_zero_range = 'zero'     # Естественная нормализация критерия с одинаковыми значениями дает нули
+    pairwise_cache_size = 64        # Число тензоров попарных сравнений, хранимых между расчетами
+    pairwise_cache = OrderedDict()  # Общий для всех экземпляров кэш по содержимому таблицы экспертных оценок
+
     expert_estimates_averaging_default_params = {
-        'EK': {'e': 0.001},
+        'EK': {
+            'e': 0.001,
+            'max_iter': 1000
+        },
         'Ryk': {
             'e': 0.01,
             'e1': 0.001,
             'p': 1,
-            'mode': 'mult'
+            'mode': 'mult',
+            'max_iter': 1000
         },
-        'Com': {'mode': 'median'}
+        'Com': {
+            'mode': 'median',
+            'consensus': 'expert',
+            'seed': 0
+        }
     }
 
     def  __init__(self, numeric_data, expert_data, expert_methods, normalization_methods, direcion_settings):
@@ -22,104 +40,126 @@ class CriteriaProcessing:
         self.normalization_methods = normalization_methods
 
     '''Сведение/обобщение экспертных оценок'''
-    def __expert_estimates_averaging__(self, criterion):
-        alternatives = list(self.expert_data[criterion].columns)
-
-        estimation = {alter: [float(self.expert_data[criterion][alter].mean())] for alter in alternatives}
-        estimation['Alternatives'] = [criterion]
-
-        return pd.DataFrame(estimation).set_index('Alternatives'), dict()
-        
-    def __Evlanov_Kutuzov_expert_estimates_averaging__(self, criterion, e=0.001):
-            K_dump = []
-
-            estimation = self.expert_data[criterion]
-
-            experts_number = len(estimation.index)
-            alternatives = list(estimation.columns)
-            experts = list(estimation.index)
-
-            K = {expert: 1 / experts_number for expert in experts}
-
-            while True:
-                K_dump.append(K)
-                alters_t = {alter: sum([estimation[alter].loc[expert] * K[expert] for expert in experts]) for alter in alternatives}
-                lambda_t = sum([alters_t[alter] * estimation[alter].loc[expert] for alter in alternatives for expert in experts])
-                K_t = {expert: sum([alters_t[alter] * estimation[alter].loc[expert] for alter in alternatives]) / lambda_t for expert in experts}
-
-                if all(abs(K[expert] - K_t[expert]) < e for expert in experts):
-                    K = K_t
-                    break
-
-                K = K_t
-            K_dump.append(K)
-
-            result_estimation = {alter: [sum(estimation[alter].loc[expert] * K[expert] for expert in experts)] for alter in alternatives}
-            result_estimation['Alternatives'] = [criterion]
-
-            return pd.DataFrame(result_estimation).set_index('Alternatives'), K_dump
-
-    def __Rykov_expert_estimates_averaging__(self, criterion, e=0.01, e1=0.001, p=1, mode='mult'):
-            K_dump = []
-
-            estimation = self.expert_data[criterion]
-
-            experts_number = len(estimation.index)
-            alternatives = list(estimation.columns)
-            experts = list(estimation.index)
-
-            K = {expert: 1 / experts_number for expert in experts}
-
-            while True:
-                K_dump.append(K)
-                alters_t = {alter: sum([estimation[alter].loc[expert] * K[expert] for expert in experts]) for alter in alternatives}
-                delta_K_t = {expert: 1 / (sum([abs(alters_t[alter] - estimation[alter].loc[expert]) ** p for alter in alternatives]) ** (1/p) + e) for expert in experts}
-                K_t = {expert: K[expert] + delta_K_t[expert] for expert in experts} if mode == 'add' else {expert: K[expert] * delta_K_t[expert] for expert in experts}
-                lambda_t = sum(K_t[expert] for expert in experts)
-                K_t = {expert: K_t[expert] / lambda_t for expert in experts}
-
-                if all(abs(K[expert] - K_t[expert]) < e1 for expert in experts):
-                    K = K_t
-                    break
-
-                K = K_t
-            K_dump.append(K)
-            
-            result_estimation = {alter: sum(estimation[alter].loc[expert] * K[expert] for expert in experts) for alter in alternatives}
-            result_estimation['Alternatives'] = [criterion]
-
-            return pd.DataFrame(result_estimation).set_index('Alternatives'), K_dump
-
-    def __get_common_ranking__(self):
-        result = {}
-
-        for criterion in self.expert_data:
-            temp_result = {}
-            estimation = self.expert_data[criterion]
-
-            alternatives = list(estimation.columns)
-            experts = list(estimation.index)
-            for expert in experts:
-                expert_ranking = {
-                    alter1:
-                    [
-                        -1 if estimation[alter1].loc[expert] < estimation[alter2].loc[expert] else 
-                        0 if estimation[alter1].loc[expert] == estimation[alter2].loc[expert] else 1
-                        for alter2 in alternatives
-                    ] for alter1 in alternatives
-                }
-                expert_ranking['Alternatives'] = alternatives
-                temp_result[expert] = pd.DataFrame(expert_ranking).set_index('Alternatives')
-        
-            result[criterion] = temp_result
-        
-        return result
+    def __stacked_expert_data__(self, criteria):
+        # Таблицы критериев одной формы складываются в массив критерии x эксперты x альтернативы
+        return np.stack([self.expert_data[criterion].to_numpy(dtype=float) for criterion in criteria])
+
+    def __estimation_frames__(self, criteria, estimations):
+        return [
+            pd.DataFrame([estimations[i]], index=pd.Index([criterion], name='Alternatives'), columns=self.expert_data[criterion].columns)
+            for i, criterion in enumerate(criteria)
+        ]
+
+    def __competence_iteration__(self, criteria, update, e, max_iter):
+        values = self.__stacked_expert_data__(criteria)
+        criteria_number, experts_number, _ = values.shape
+
+        # История коэффициентов компетентности: итерация x критерий x эксперт, буфер удваивается по мере надобности
+        K_dump = np.empty((min(max_iter + 1, 16), criteria_number, experts_number))
+        K_dump[0] = 1 / experts_number
+
+        # Сошедшиеся критерии исключаются из дальнейших итераций
+        active = np.ones(criteria_number, dtype=bool)
+        iterations = np.zeros(criteria_number, dtype=int)
+        step = 0
+        while step < max_iter and active.any():
+            K = K_dump[step, active]
+            K_t = update(K, values[active])
+            K_t = K_t / K_t.sum(axis=1, keepdims=True)
+
+            if step + 1 == len(K_dump):
+                K_dump = np.concatenate([K_dump, np.empty((min(len(K_dump), max_iter + 1 - len(K_dump)),) + K_dump.shape[1:])])
+            K_dump[step + 1] = K_dump[step]
+            K_dump[step + 1, active] = K_t
+            step += 1
+            iterations[active] = step
+            active[active] = ~(np.abs(K_t - K) < e).all(axis=1)
+
+        K = K_dump[iterations, np.arange(criteria_number)]
+        estimations = np.einsum('ce,cea->ca', K, values)
+
+        dumps = [
+            {
+                'K': pd.DataFrame(K_dump[:iterations[i] + 1, i], columns=self.expert_data[criterion].index),
+                'converged': not active[i],
+                'iterations': int(iterations[i])
+            }
+            for i, criterion in enumerate(criteria)
+        ]
+
+        return estimations, dumps
+
+    def __batched_estimates_averaging__(self, criteria):
+        estimations = self.__stacked_expert_data__(criteria).mean(axis=1)
+        return self.__estimation_frames__(criteria, estimations), [dict() for _ in criteria]
+
+    def __batched_Evlanov_Kutuzov__(self, criteria, e=0.001, max_iter=1000):
+        def update(K, values):
+            alters_t = np.einsum('ce,cea->ca', K, values)
+            return np.einsum('cea,ca->ce', values, alters_t)
+
+        estimations, dumps = self.__competence_iteration__(criteria, update, e, max_iter)
+        return self.__estimation_frames__(criteria, estimations), dumps
+
+    def __batched_Rykov__(self, criteria, e=0.01, e1=0.001, p=1, mode='mult', max_iter=1000):
+        if mode not in ['add', 'mult']:
+            raise ValueError("Некорректное правило пересчета компетентности")
+
+        def update(K, values):
+            alters_t = np.einsum('ce,cea->ca', K, values)
+            # p-норма отклонения оценок каждого эксперта от обобщенной
+            delta_K_t = 1 / ((np.abs(alters_t[:, None, :] - values) ** p).sum(axis=2) ** (1 / p) + e)
+            return K + delta_K_t if mode == 'add' else K * delta_K_t
+
+        estimations, dumps = self.__competence_iteration__(criteria, update, e1, max_iter)
+        return self.__estimation_frames__(criteria, estimations), dumps
 
-    def __common_metric_median__(self, ranking1, ranking2):
-        return 0.5 * sum(abs(ranking1[alter1].loc[alter2] - ranking2[alter1].loc[alter2]) for alter1 in ranking1.columns for alter2 in ranking1.index)
-
-    def __common_metric_mean__(self, ranking1, ranking2):
-        return 0.5 * sum(abs(ranking1[alter1].loc[alter2] - ranking2[alter1].loc[alter2]) ** 2 for alter1 in ranking1.columns for alter2 in ranking1.index)
+    def __expert_estimates_averaging__(self, criterion):
+        results, dumps = self.__batched_estimates_averaging__([criterion])
+        return results[0], dumps[0]
+
+    def __Evlanov_Kutuzov_expert_estimates_averaging__(self, criterion, e=0.001, max_iter=1000):
+        results, dumps = self.__batched_Evlanov_Kutuzov__([criterion], e=e, max_iter=max_iter)
+        return results[0], dumps[0]
+
+    def __Rykov_expert_estimates_averaging__(self, criterion, e=0.01, e1=0.001, p=1, mode='mult', max_iter=1000):
+        results, dumps = self.__batched_Rykov__([criterion], e=e, e1=e1, p=p, mode=mode, max_iter=max_iter)
+        return results[0], dumps[0]
+
+    def __pairwise_signs__(self, criterion):
+        # Тензор попарных сравнений эксперт x alter2 x alter1, элемент - sign(alter1 - alter2)
+        values = np.ascontiguousarray(self.expert_data[criterion].to_numpy(dtype=float))
+        key = blake2b(values.tobytes() + str(values.shape).encode() + str(values.dtype).encode(), digest_size=16).hexdigest()
+
+        cache = CriteriaProcessing.pairwise_cache
+        if key in cache:
+            cache.move_to_end(key)
+            return cache[key]
+
+        signs = np.sign(values[:, None, :] - values[:, :, None]).astype(np.int8)
+        signs.setflags(write=False)
+        cache[key] = signs
+        while len(cache) > self.pairwise_cache_size:
+            cache.popitem(last=False)
+        return signs
+
+    def __get_common_ranking__(self, criterion):
+        estimation = self.expert_data[criterion]
+        alternatives = pd.Index(estimation.columns, name='Alternatives')
+        signs = self.__pairwise_signs__(criterion).astype(int)
+
+        return {expert: pd.DataFrame(signs[i], index=alternatives, columns=estimation.columns) for i, expert in enumerate(estimation.index)}
+
+    def __common_distances__(self, signs, mode='median'):
+        # Для значений из {-1, 0, 1}: (a - b)^2 = a^2 + b^2 - 2ab, |a - b| = a^2 + b^2 - ab - a^2 b^2
+        flat = signs.reshape(len(signs), -1).astype(float)
+        squares = flat ** 2
+        squares_sum = squares.sum(axis=1)
+        products = flat @ flat.T
+
+        if mode == 'mean':
+            return 0.5 * (squares_sum[:, None] + squares_sum[None, :] - 2 * products)
+        return 0.5 * (squares_sum[:, None] + squares_sum[None, :] - products - squares @ squares.T)
 
     def __choose_pos__(self, array):
         neg_num = (array == -1).sum()
@@ -165,155 +205,130 @@ class CriteriaProcessing:
 
         return {alternatives[i]: ranks[i] for i in range(len(alternatives))} #len(ranks) + 1 - 
 
-    def __commom_ranking__(self, criterion, mode='median'):
-            dump = {'mode': mode}
-
-            expert_common_rankings = self.__get_common_ranking__()
-            dump['pairs_rankings'] = expert_common_rankings[criterion]
+    def __commom_ranking__(self, criterion, mode='median', consensus='expert', seed=0):
+        dump = {'mode': mode, 'consensus': consensus}
 
-            '''
-            results = {}
-            for criterion in expert_common_rankings:
-                rankings = expert_common_rankings[criterion]
-                alternatives = list(self.expert_data[list(self.expert_data.keys())[0]].columns)
-
-                optimal_ranking = {
-                    alter1:
-                    [
-                        self.__choose_pos__(np.array([rankings[expert][alter1].loc[alter2] for expert in rankings]))
-                        for alter2 in alternatives
-                    ] for alter1 in alternatives
-                }
-                optimal_ranking['Alternatives'] = alternatives
-
-                results[criterion] = self.__pairwise_to_ranking__(pd.DataFrame(optimal_ranking).set_index('Alternatives').T.values, alternatives=alternatives)
-
-            result_df = {alter: [results[criterion][alter] for criterion in expert_common_rankings] for alter in alternatives}
-            result_df['Alternatives'] = [criterion for criterion in expert_common_rankings]
-            return pd.DataFrame(result_df).set_index('Alternatives')
-            '''
-
-        #results = []
-        #for criterion in expert_common_rankings:
-            rankings = expert_common_rankings[criterion]
+        experts = list(self.expert_data[criterion].index)
+        alternatives = list(self.expert_data[criterion].columns)
+        dump['pairs_rankings'] = self.__get_common_ranking__(criterion)
 
-            metric = self.__common_metric_mean__ if mode == 'mean' else self.__common_metric_median__
-            dump['distances'] = [[expert, expert2, metric(ranking1=rankings[expert], ranking2=rankings[expert2])] for expert, expert2 in list(combinations(list(rankings.keys()), 2))]
+        signs = self.__pairwise_signs__(criterion)
+        distances = self.__common_distances__(signs, mode)
+        dump['distances'] = [[experts[i], experts[j], distances[i, j]] for i, j in combinations(range(len(experts)), 2)]
 
-            distances = {expert: sum(metric(ranking1=rankings[expert], ranking2=rankings[expert2]) for expert2 in rankings) for expert in rankings}
-            optimal_expert = min(distances, key = lambda k: distances[k]) 
+        if consensus == 'expert':
+            # Ближайшая к остальным ранжировка одного из экспертов
+            optimal_expert = experts[int(np.argmin(distances.sum(axis=1)))]
             dump['expert'] = optimal_expert
 
             optimal_estimation = pd.DataFrame(self.expert_data[criterion].loc[optimal_expert]).T
-            optimal_estimation['Alternatives'] = [criterion]
-            optimal_estimation = optimal_estimation.set_index('Alternatives')
+        elif consensus == 'kemeny':
+            # Медиана Кемени по всем возможным ранжировкам, оценка альтернативы - число альтернатив не выше нее
+            order, distance, exact = KemenyRanking(signs, mode, seed).calculate()
+            dump['ranking'] = [alternatives[i] for i in order]
+            dump['distance'] = distance
+            dump['exact'] = exact
+
+            places = np.empty(len(alternatives), dtype=int)
+            places[order] = np.arange(1, len(alternatives) + 1)
+            optimal_estimation = pd.DataFrame([len(alternatives) - places + 1], columns=self.expert_data[criterion].columns).astype(float)
+        else:
+            raise ValueError("Некорректный способ построения обобщенной ранжировки")
 
-            #results.append(optimal_estimation)
+        optimal_estimation['Alternatives'] = [criterion]
+        optimal_estimation = optimal_estimation.set_index('Alternatives')
 
-            return optimal_estimation, dump
+        return optimal_estimation, dump
 
     def __expert_assessments_generalization__(self, params=None):
         related_information = {}
         result_string = {}
+
+        batched_methods = {
+            "Усреднение экспертных оценок": lambda criteria: self.__batched_estimates_averaging__(criteria),
+            "Усреднение с оценкой компетентности экспертов по алгоритму Евланова-Кутузова": lambda criteria: self.__batched_Evlanov_Kutuzov__(criteria, **params['EK']),
+            "Усреднение с оценкой компетентности экспертов по алгоритму Рыкова": lambda criteria: self.__batched_Rykov__(criteria, **params['Ryk'])
+        }
+
+        # Критерии с одинаковым методом и размером таблицы обрабатываются одним пакетом
+        groups = {}
         for criterion in self.expert_methods:
-            if self.expert_methods[criterion] == "Усреднение экспертных оценок":
-                result_string[criterion], related_information[criterion] = self.__expert_estimates_averaging__(criterion)
-            elif self.expert_methods[criterion] == "Усреднение с оценкой компетентности экспертов по алгоритму Евланова-Кутузова":
-                result_string[criterion], related_information[criterion] = self.__Evlanov_Kutuzov_expert_estimates_averaging__(criterion, **params['EK'])
-            elif self.expert_methods[criterion] == "Усреднение с оценкой компетентности экспертов по алгоритму Рыкова":
-                result_string[criterion], related_information[criterion] = self.__Rykov_expert_estimates_averaging__(criterion, **params['Ryk'])
+            if self.expert_methods[criterion] in batched_methods:
+                groups.setdefault((self.expert_methods[criterion], self.expert_data[criterion].shape), []).append(criterion)
             elif self.expert_methods[criterion] == "Обобщенная ранжировка":
                 result_string[criterion], related_information[criterion] = self.__commom_ranking__(criterion,**params['Com'])
             else:
                 raise ValueError("Некорректный метод обобщения экспертных оценок")
-        return pd.concat([result_string[criterion] for criterion in result_string]), related_information
-    
-    '''Смена направления'''
-    def __negative_change_dir__(self, alters):
-        return [-i for i in alters]
 
-    def __Sevidzh__(self, alters, max_Sev):
-        max_value = alters.max() if max_Sev is None else max_Sev
-        return [max_value - i for i in alters]
+        for (method, _), criteria in groups.items():
+            results, dumps = batched_methods[method](criteria)
+            for criterion, result, dump in zip(criteria, results, dumps):
+                result_string[criterion], related_information[criterion] = result, dump
 
-    def __direction_changing__(self, data):
+        return pd.concat([result_string[criterion] for criterion in self.expert_methods]), related_information
+    
+    '''Смена направления'''
+    def __direction_changing__(self, values, criteria):
+        # Смена направления на месте в строках массива критерии x альтернативы
         direction_changes = self.direcion_settings['direction_changes']
         savige_max_value = self.direcion_settings['savige_max_values']
+        positions = {criterion: i for i, criterion in enumerate(criteria)}
 
         for criterion in direction_changes:
+            row = values[positions[criterion]]
             if direction_changes[criterion] == 'negation':
-                data.loc[criterion] = self.__negative_change_dir__(data.loc[criterion])
+                np.negative(row, out=row)
             elif direction_changes[criterion] == 'savige':
-                data.loc[criterion] = self.__Sevidzh__(data.loc[criterion], savige_max_value[criterion])
+                max_value = row.max() if savige_max_value[criterion] is None else savige_max_value[criterion]
+                np.subtract(max_value, row, out=row)
             else:
                 raise ValueError("Некорректный способ смены направления")
             
-        return data
+        return values
 
     '''Нормализация критериев'''
-    def __relative__(self, alters):
-        value = abs(alters.max()) if alters.max() > 0.0 else abs(alters.min()) if alters.max() < 0.0 else abs(alters.min()) if alters.min() != 0.0 else alters.max() + 10**-6
-        return [i / value for i in alters]
-
-    def __comparative__(self, alters):
-        min_value = alters.min()
-        return [i - min_value for i in alters]
-    
-    def __natural__(self, alters):
-        max_value = alters.max()
-        min_value = alters.min()
-        return [i / (max_value - min_value) if max_value != min_value else 0 for i in alters]
-
-    def __full__(self, alters):
-        max_value = alters.max()
-        min_value = alters.min()
-        return [(i - min_value) / (max_value - min_value) if max_value != min_value else 0 for i in alters]
-
-    def __normalize__(self, data):
-        data = data.astype(float)
-
-        for criterion in data.index:
-            if self.normalization_methods[criterion] == 'Относительная нормализация':
-                data.loc[criterion] = self.__relative__(data.loc[criterion])
-            elif self.normalization_methods[criterion] == 'Сравнительная нормализация':
-                data.loc[criterion] = self.__comparative__(data.loc[criterion])
-            elif self.normalization_methods[criterion] == 'Естественная нормализация':
-                data.loc[criterion] = self.__natural__(data.loc[criterion])
-            elif self.normalization_methods[criterion] == 'Полная нормализация':
-                data.loc[criterion] = self.__full__(data.loc[criterion])
-            elif self.normalization_methods[criterion] == "Нет нормализации":
-                pass
-            else:
-                raise ValueError("Некорректный метод нормализации")
-        return data.apply(lambda row: row.mask(row <= row.max() * 10**-4, row.max() * 10**-4), axis=1)
+    def __normalize__(self, values, criteria):
+        Normalization.normalize_rows(values, [self.normalization_methods[criterion] for criterion in criteria], zero_range=self.natural_zero_range, out=values)
+        return Normalization.floor(values, axis=1, out=values)
 
     '''Обработка данных'''
-    def get_processed_data(self, expert_assessments_generalization_params=None):
+    def get_processed_data(self, expert_assessments_generalization_params=None, snapshots=True):
+        # snapshots=False - промежуточные таблицы для отчета не сохраняются, обработка идет в одном буфере
         related_information = {
             "expert_assessments_generalization": {}
         }
 
-        #print("Installing params")
-        if expert_assessments_generalization_params is None:
-            gen_params = {}
+        gen_params = dict() if expert_assessments_generalization_params is None else dict(expert_assessments_generalization_params)
         for mode in self.expert_estimates_averaging_default_params:
             if not mode in gen_params.keys():
                 gen_params[mode] = self.expert_estimates_averaging_default_params[mode]
 
-        #print("Expert assignment generalization")
-        generalized_expert_ratings, related_information["expert_assessments_generalization"]["data"] = self.__expert_assessments_generalization__(gen_params)
+        if self.expert_methods:
+            generalized_expert_ratings, related_information["expert_assessments_generalization"]["data"] = self.__expert_assessments_generalization__(gen_params)
+        else:
+            generalized_expert_ratings, related_information["expert_assessments_generalization"]["data"] = pd.DataFrame(columns=self.numeric_data.columns), dict()
         related_information["expert_assessments_generalization"]["methods"] = self.expert_methods
 
-        #print("Get common table")
-        evaluating_alternatives = pd.concat([self.numeric_data, generalized_expert_ratings])
-        related_information['result_criterions_values'] = evaluating_alternatives
+        # Общая таблица критериев в одном буфере float64
+        criteria = pd.Index(list(self.numeric_data.index) + list(generalized_expert_ratings.index))
+        alternatives = self.numeric_data.columns if len(self.numeric_data.index) > 0 else generalized_expert_ratings.columns
+        values = np.empty((len(criteria), len(alternatives)))
+        values[:len(self.numeric_data.index)] = self.numeric_data.to_numpy(dtype=float)
+        values[len(self.numeric_data.index):] = generalized_expert_ratings[alternatives].to_numpy(dtype=float)
+
+        if snapshots:
+            related_information['result_criterions_values'] = pd.DataFrame(values.copy(), index=criteria, columns=alternatives)
 
-        #print("__direction_changing__")
-        evaluating_alternatives_2 = self.__direction_changing__(evaluating_alternatives)
-        related_information['direction_changing_result'] = evaluating_alternatives_2
+        self.__direction_changing__(values, criteria)
+        if snapshots:
+            related_information['direction_changing_result'] = pd.DataFrame(values.copy(), index=criteria, columns=alternatives)
 
-        #print("__normalize__")
-        evaluating_alternatives_3 = self.__normalize__(evaluating_alternatives)
-        related_information['normalization_result'] = evaluating_alternatives_3
+        self.__normalize__(values, criteria)
+        evaluating_alternatives = pd.DataFrame(values, index=criteria, columns=alternatives, copy=False)
+        related_information['normalization_result'] = evaluating_alternatives
         
-        return evaluating_alternatives_3, related_information
+        return evaluating_alternatives, related_information
+
+    def get_processed_blocks(self, blocks):
+        # Обработка числовых критериев по частям, blocks - функция, возвращающая итератор блоков альтернатив
+        return ChunkedProcessing(blocks, self.normalization_methods, self.direcion_settings, zero_range=self.natural_zero_range).get_processed_blocks()
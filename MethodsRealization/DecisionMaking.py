@@ -1,8 +1,7 @@
 from copy import copy
 import numpy as np
 import pandas as pd
-from math import isclose, log, prod
-from itertools import combinations
+from math import log
 
 
 class DecisionMaking:
@@ -18,26 +17,151 @@ class DecisionMaking:
         'lex_equal': 'Лексикографический принцип равенства',
         'lex_qequal': 'Лексикографический принцип квазиравенства'
     }
+    # Ограничение на число элементов промежуточных массивов при блочных вычислениях
+    block_elements = 2 ** 22
+    # Относительная точность сравнения значений в принципах равенства (как в math.isclose)
+    equality_rel_tol = 1e-09
+    # Начиная с этого числа альтернатив фронт ищется сортировочным алгоритмом SFS
+    pareto_sort_threshold = 2048
 
     def __init__(self, data, weights=None):
         self.data = data
         self.weights = weights
+        self.statistics = None
+
+    def __statistics__(self):
+        # Общие для всех принципов величины считаются один раз для текущих данных и весов
+        if self.statistics is not None and self.statistics['data'] is self.data and self.statistics['weights'] is self.weights:
+            return self.statistics
+
+        values = self.data.to_numpy(dtype=float)
+        weights = self.__weights_vector__()
+        product_signs, log_products = self.__signed_log_products__(values, weights[:, None])
+        has_alternatives = values.shape[1] > 0
+
+        self.statistics = {
+            'data': self.data,
+            'weights': self.weights,
+            'values': values,
+            'weights_vector': weights,
+            'max': values.max(axis=1) if has_alternatives else np.full(len(values), np.nan),
+            'min': values.min(axis=1) if has_alternatives else np.full(len(values), np.nan),
+            'weighted': weights[:, None] * values,
+            'weighted_sums': (weights[:, None] * values).sum(axis=0),
+            'product_signs': product_signs,
+            'log_weighted_products': log_products
+        }
 
-    def __eucl__(self, x, y):
-        weights = {criterion: 1 for criterion in x.index} if self.weights is None else self.weights
-        return sum((weights[criterion] * (x.loc[criterion] - y.loc[criterion])) ** 2 for criterion in x.index) ** 0.5
+        return self.statistics
+
+    """Взвешенное произведение критериев"""
+    # Произведение prod(x ** w) хранится как знак и логарифм модуля, чтобы не терять представимость в float;
+    # отрицательное значение с дробным весом не дает вещественного числа, знак такого произведения - NaN
+    @staticmethod
+    def __signed_log_products__(values, weights):
+        # Произведение по оси критериев (-2), weights приводится к форме values
+        with np.errstate(divide='ignore', invalid='ignore'):
+            log_abs = np.where(weights != 0, weights * np.log(np.abs(values)), 0.0)
+        odd_weights = np.round(weights) % 2 == 1
+        negative_signs = np.where(weights == np.round(weights), np.where(odd_weights, -1.0, 1.0), np.nan)
+        signs = np.where(values > 0, 1.0, np.where(values == 0, np.where(weights > 0, 0.0, 1.0), negative_signs))
+        # Критерии с нулевым весом не влияют на произведение (0 ** 0 = 1)
+        signs = np.where(weights == 0, 1.0, signs)
+        return np.prod(signs, axis=-2), log_abs.sum(axis=-2)
+
+    @staticmethod
+    def __products_order__(signs, log_abs):
+        # Произведения сравниваются сначала по знаку, затем по логарифму модуля (для отрицательных - в обратную сторону);
+        # неопределенные произведения получают уровень ниже всех
+        levels = np.where(np.isnan(signs), -2.0, signs)
+        with np.errstate(invalid='ignore'):
+            oriented = np.where(signs == 0, 0.0, signs * log_abs)
+        return levels, oriented
+
+    @staticmethod
+    def __products_optimum__(signs, log_abs):
+        # Маска наибольших произведений по последней оси, неопределенные произведения пропускаются
+        levels, oriented = DecisionMaking.__products_order__(signs, log_abs)
+        candidates = (levels == levels.max(axis=-1, keepdims=True)) & (levels > -2)
+        best = np.where(candidates, oriented, -np.inf).max(axis=-1, keepdims=True)
+        return candidates & (oriented == best)
+
+    @staticmethod
+    def __products_greater__(signs, log_abs, value):
+        # Маска произведений, больших value
+        if value > 0:
+            return (signs > 0) & (log_abs > log(value))
+        if value == 0:
+            return signs > 0
+        return (signs >= 0) | ((signs < 0) & (log_abs < log(-value)))
+
+    @staticmethod
+    def __products_ranks__(signs, log_abs):
+        # Плотный ранг произведения (1 - наименьшее) для оценок альтернатив, у неопределенных - NaN
+        levels, oriented = DecisionMaking.__products_order__(signs, log_abs)
+        defined = (levels > -2) & ~np.isnan(oriented)
+        ranks = np.full(len(signs), np.nan)
+        if defined.any():
+            _, inverse = np.unique(np.stack([levels[defined], oriented[defined]], axis=1), axis=0, return_inverse=True)
+            ranks[defined] = inverse.ravel() + 1
+        return ranks
+
+    """Метрики"""
+    # deviations - модули взвешенных отклонений: сценарии x критерии x альтернативы
+    def __euclidean__(self, deviations, p=None):
+        return np.sqrt((deviations ** 2).sum(axis=1))
+
+    def __chebyshev__(self, deviations, p=None):
+        return deviations.max(axis=1)
+
+    def __manhattan__(self, deviations, p=None):
+        return deviations.sum(axis=1)
+
+    def __minkowski__(self, deviations, p=2):
+        return (deviations ** p).sum(axis=1) ** (1 / p)
+
+    def __weights_vector__(self):
+        if self.weights is None:
+            return np.ones(len(self.data.index))
+        return np.array([self.weights[criterion] for criterion in self.data.index], dtype=float)
+
+    def __weighted_distances__(self, weights, point, metric=None, metric_p=2):
+        metrics = {
+            'euclidean': self.__euclidean__,
+            'chebyshev': self.__chebyshev__,
+            'manhattan': self.__manhattan__,
+            'minkowski': self.__minkowski__
+        }
 
-    """Принципы оптимальности"""
-    def __ideal_point__(self, idp=None, metric=None):
         if metric is None:
-            metric = self.__eucl__
+            metric = 'euclidean'
+        if metric not in metrics:
+            raise ValueError("Некорректная метрика")
+
+        point = point.loc[self.data.index].to_numpy(dtype=float)
+        deviations = self.__statistics__()['values'] - point[:, None]
+
+        distances = np.empty((len(weights), deviations.shape[1]))
+        step = max(1, self.block_elements // max(1, deviations.size))
+        for start in range(0, len(weights), step):
+            distances[start:start + step] = metrics[metric](np.abs(weights[start:start + step, :, None] * deviations[None, :, :]), metric_p)
+        return distances
 
-        idp = pd.Series({criterion: max(self.data.loc[criterion]) for criterion in self.data.index}) if idp is None else pd.Series(idp)
-        estimated_value = {alternative: metric(self.data[alternative], idp) for alternative in self.data.columns}
+    def __distances__(self, point, metric=None, metric_p=2):
+        # Пользовательская функция расстояния вычисляется для каждой альтернативы отдельно
+        if callable(metric):
+            return np.array([metric(self.data[alternative], point) for alternative in self.data.columns], dtype=float)
 
-        optimal_alternatives = [alter for alter in estimated_value if estimated_value[alter] == min(estimated_value.values())]
+        return self.__weighted_distances__(self.__statistics__()['weights_vector'][None, :], point, metric, metric_p)[0]
+
+    """Принципы оптимальности"""
+    def __ideal_point__(self, idp=None, metric=None, metric_p=2):
+        idp = pd.Series(self.__statistics__()['max'], index=self.data.index) if idp is None else pd.Series(idp)
+        distances = self.__distances__(idp, metric, metric_p)
+
+        optimal_alternatives = self.data.columns[distances == distances.min()].tolist() if len(distances) > 0 else []
         data_with_distances = self.data.copy()
-        data_with_distances.loc['Расстояния до идеальной точки', :] = [estimated_value[alternative] for alternative in self.data.columns]
+        data_with_distances.loc['Расстояния до идеальной точки', :] = distances
 
         dump = {
             'ideal_point': idp,
@@ -47,16 +171,13 @@ class DecisionMaking:
 
         return optimal_alternatives, dump
 
-    def __antiideal_point__(self, aidp=None, metric=None):
-        if metric is None:
-            metric = self.__eucl__
-
-        aidp = pd.Series({criterion: min(self.data.loc[criterion]) for criterion in self.data.index}) if aidp is None else pd.Series(aidp)
-        estimated_value = {alternative: metric(self.data[alternative], aidp) for alternative in self.data.columns}
+    def __antiideal_point__(self, aidp=None, metric=None, metric_p=2):
+        aidp = pd.Series(self.__statistics__()['min'], index=self.data.index) if aidp is None else pd.Series(aidp)
+        distances = self.__distances__(aidp, metric, metric_p)
 
-        optimal_alternatives = [alter for alter in estimated_value if estimated_value[alter] == max(estimated_value.values())]
+        optimal_alternatives = self.data.columns[distances == distances.max()].tolist() if len(distances) > 0 else []
         data_with_distances = self.data.copy()
-        data_with_distances.loc['Расстояния до антиидеальной точки', :] = [estimated_value[alternative] for alternative in self.data.columns]
+        data_with_distances.loc['Расстояния до антиидеальной точки', :] = distances
 
         dump = {
             'anti_ideal_point': aidp,
@@ -66,24 +187,72 @@ class DecisionMaking:
 
         return optimal_alternatives, dump
 
-    def __pareto_domination__(self, target_alternative, compared_alternative):
-        return all(target_alternative.loc[criterion] >= compared_alternative.loc[criterion] for criterion in target_alternative.index)\
-              and any(target_alternative.loc[criterion] > compared_alternative.loc[criterion] for criterion in target_alternative.index)
+    def __dominance_matrix__(self, targets, dominators):
+        # [i, j] = True, если альтернатива dominators[j] доминирует по Парето над альтернативой targets[i]
+        greater_equal = np.ones((len(targets), len(dominators)), dtype=bool)
+        greater = np.zeros((len(targets), len(dominators)), dtype=bool)
+        for criterion in range(targets.shape[1]):
+            greater_equal &= dominators[None, :, criterion] >= targets[:, criterion, None]
+            greater |= dominators[None, :, criterion] > targets[:, criterion, None]
+        return greater_equal & greater
+
+    def __pareto_dominated__(self, targets, dominators):
+        dominated = np.zeros(len(targets), dtype=bool)
+        if len(dominators) == 0:
+            return dominated
+
+        rows = max(1, self.block_elements // len(dominators))
+        for start in range(0, len(targets), rows):
+            dominated[start:start + rows] = self.__dominance_matrix__(targets[start:start + rows], dominators).any(axis=1)
+        return dominated
+
+    def __pareto_front_sfs__(self, values):
+        # Sort-Filter-Skyline: после сортировки по убыванию суммы (и лексикографически при равенстве сумм)
+        # альтернатива может быть доминирована только альтернативами, стоящими раньше нее
+        order = np.lexsort((*(-values[:, ::-1].T), -values.sum(axis=1)))
+        block = max(1, int(self.block_elements ** 0.5))
+
+        front = np.empty((0, values.shape[1]))
+        front_indices = []
+        for start in range(0, len(order), block):
+            indices = order[start:start + block]
+            candidates = values[indices]
+
+            survived = ~self.__pareto_dominated__(candidates, front)
+            indices, candidates = indices[survived], candidates[survived]
+
+            survived = ~self.__pareto_dominated__(candidates, candidates)
+            front = np.vstack([front, candidates[survived]])
+            front_indices.append(indices[survived])
+
+        mask = np.zeros(len(values), dtype=bool)
+        mask[np.concatenate(front_indices)] = True
+        return mask
+
+    def __pareto_front_mask__(self, values):
+        # values - матрица альтернативы x критерии
+        if len(values) > self.pareto_sort_threshold:
+            return self.__pareto_front_sfs__(values)
+        return ~self.__pareto_dominated__(values, values)
 
     def __Pareto__(self):
-        dump = {}
-
+        statistics = self.__statistics__()
         alternatives = self.data.columns
-        weights = {criterion: 1 for criterion in self.data.index} if self.weights is None else self.weights
 
-        front_pareto = [alternative for alternative in alternatives if not any(self.__pareto_domination__(self.data[compares_alternative], self.data[alternative]) for compares_alternative in alternatives)]
-        dominant_alternatives = {
-            alternative: [dominant_alternative for dominant_alternative in alternatives if self.__pareto_domination__(self.data[dominant_alternative], self.data[alternative])] for alternative in alternatives 
-            if any(self.__pareto_domination__(self.data[compares_alternative], self.data[alternative]) for compares_alternative in alternatives)
-        }
+        values = statistics['values'].T
+        front_mask = self.__pareto_front_mask__(values)
+        front_pareto = alternatives[front_mask].tolist()
+
+        dominant_alternatives = {}
+        dominated_indices = np.flatnonzero(~front_mask)
+        rows = max(1, self.block_elements // len(values))
+        for start in range(0, len(dominated_indices), rows):
+            block = dominated_indices[start:start + rows]
+            for alternative, dominance in zip(block, self.__dominance_matrix__(values[block], values)):
+                dominant_alternatives[alternatives[alternative]] = alternatives[dominance].tolist()
         
         result_data = self.data[front_pareto].copy()
-        result_data.loc['Взвешенное среднее значение критериев'] = (result_data.mul(pd.Series(weights), axis=0).sum(axis=0))
+        result_data.loc['Взвешенное среднее значение критериев'] = statistics['weighted_sums'][front_mask]
 
         dump = {
             'dominant_alternatives': dominant_alternatives,
@@ -93,23 +262,42 @@ class DecisionMaking:
 
         return front_pareto, dump
 
-    def __equal_principle__(self):
-        weights = {criterion: 1 for criterion in self.data.index} if self.weights is None else self.weights
+    def __equality_violation__(self, sigma=None, weighted=None):
+        # Наибольшее превышение допустимого отклонения по парам взвешенных значений критериев;
+        # альтернатива удовлетворяет принципу (квази)равенства, если превышение не положительно.
+        # weighted - матрица критерии x альтернативы или массив сценарии x критерии x альтернативы
+        weighted = self.__statistics__()['weighted'] if weighted is None else weighted
+        criteria_number = weighted.shape[-2]
 
-        weighted_data = self.data.mul(pd.Series(weights), axis=0)
-        optimal_alternatives = [
-            alternative for alternative in self.data.columns 
-            if all(isclose(weighted_data[alternative].loc[criterion1], weighted_data[alternative].loc[criterion2]) 
-                   for criterion1 in self.data.index for criterion2 in self.data.index)
-        ]
+        if sigma is None:
+            tolerance = np.zeros((criteria_number, criteria_number))
+        else:
+            # Пара (i, j) проверяется в обоих порядках, поэтому допустимое отклонение - минимум из sigma[i][j] и sigma[j][i]
+            tolerance = sigma.loc[self.data.index, self.data.index].to_numpy(dtype=float)
+            tolerance = np.minimum(tolerance, tolerance.T)
+        off_diagonal = tolerance[~np.eye(criteria_number, dtype=bool)]
+
+        if criteria_number < 2 or (off_diagonal == off_diagonal[0]).all():
+            # Одинаковые отклонения для всех пар - достаточно проверить размах взвешенных значений
+            upper, lower = weighted.max(axis=-2), weighted.min(axis=-2)
+            relative = self.equality_rel_tol * np.maximum(np.abs(upper), np.abs(lower))
+            return upper - lower - np.maximum(relative, off_diagonal[0] if criteria_number > 1 else 0)
+
+        violation = np.empty(weighted.shape[:-2] + weighted.shape[-1:])
+        step = max(1, self.block_elements // (criteria_number ** 2 * int(np.prod(weighted.shape[:-2]))))
+        for start in range(0, weighted.shape[-1], step):
+            block = weighted[..., start:start + step]
+            differences = np.abs(block[..., :, None, :] - block[..., None, :, :])
+            relative = self.equality_rel_tol * np.maximum(np.abs(block[..., :, None, :]), np.abs(block[..., None, :, :]))
+            violation[..., start:start + step] = (differences - np.maximum(relative, tolerance[:, :, None])).max(axis=(-3, -2))
+        return violation
 
-        for criterion1, criterion2 in list(combinations(weighted_data.index, 2)):
-            weighted_data.loc[f'Разница критериев {criterion1} и {criterion2}', :] = [
-                abs(weighted_data.loc[criterion1, alternative] - weighted_data.loc[criterion2, alternative]) for alternative in weighted_data.columns
-            ]
+    def __equal_principle__(self):
+        weighted_data = pd.DataFrame(self.__statistics__()['weighted'], index=self.data.index, columns=self.data.columns)
+        optimal_alternatives = self.data.columns[self.__equality_violation__() <= 0].tolist()
 
         dump = {
-            'equal_values': {alternative: self.data[alternative].loc[self.data.index[0]] * weights[self.data.index[0]] for alternative in optimal_alternatives},
+            'equal_values': {alternative: weighted_data[alternative].iloc[0] for alternative in optimal_alternatives},
             'optimal_alternatives': optimal_alternatives,
             'weighted_values': weighted_data
         }
@@ -117,19 +305,8 @@ class DecisionMaking:
         return optimal_alternatives, dump
 
     def __quasi_equal_principle__(self, sigma):
-        weights = {criterion: 1 for criterion in self.data.index} if self.weights is None else self.weights
-
-        weighted_data = self.data.mul(pd.Series(weights), axis=0)
-        optimal_alternatives = [
-            alternative for alternative in self.data.columns 
-            if all(isclose(weighted_data[alternative].loc[criterion1], weighted_data[alternative].loc[criterion2], abs_tol=sigma[criterion1].loc[criterion2]) 
-                   for criterion1 in self.data.index for criterion2 in self.data.index)
-        ]
-
-        for criterion1, criterion2 in list(combinations(weighted_data.index, 2)):
-            weighted_data.loc[f'Разница критериев {criterion1} и {criterion1}', :] = [
-                abs(weighted_data.loc[criterion1, alternative] - weighted_data.loc[criterion2, alternative]) for alternative in weighted_data.columns
-            ]
+        weighted_data = pd.DataFrame(self.__statistics__()['weighted'], index=self.data.index, columns=self.data.columns)
+        optimal_alternatives = self.data.columns[self.__equality_violation__(sigma) <= 0].tolist()
 
         dump = {
             'sigma': sigma,
@@ -140,10 +317,10 @@ class DecisionMaking:
         return optimal_alternatives, dump
 
     def __absolute_concession__(self):
-        weights = {criterion: 1 for criterion in self.data.index} if self.weights is None else self.weights
+        statistics = self.__statistics__()
         
         data_with_common_criterion = self.data.copy()
-        data_with_common_criterion.loc['Взвешенная сумма критериев', :] = [(self.data[alternative] * pd.Series(weights)).sum() for alternative in self.data.columns]
+        data_with_common_criterion.loc['Взвешенная сумма критериев', :] = statistics['weighted_sums']
         optimal_alternatives = data_with_common_criterion.columns[data_with_common_criterion.loc['Взвешенная сумма критериев'] == data_with_common_criterion.loc['Взвешенная сумма критериев'].max()].tolist()
         
         dump = {
@@ -154,33 +331,49 @@ class DecisionMaking:
         return optimal_alternatives, dump
 
     def __relative_concession__(self):
-        weights = {criterion: 1 for criterion in self.data.index} if self.weights is None else self.weights
+        statistics = self.__statistics__()
         
+        signs, log_products = statistics['product_signs'], statistics['log_weighted_products']
+
+        # Оптимум ищется по знаку и логарифму модуля произведения, само произведение выводится, только если оно представимо в float
+        representable = (log_products == -np.inf) | ((log_products >= log(np.finfo(float).tiny)) & (log_products <= log(np.finfo(float).max)))
+        with np.errstate(over='ignore', under='ignore', invalid='ignore'):
+            products = np.where(signs == 0, 0.0, np.where(representable, signs * np.exp(log_products), np.nan))
+
         data_with_common_criterion = self.data.copy()
-        data_with_common_criterion.loc['Взвешенное произведение критериев', :] = [prod(self.data[alternative].loc[criterion] ** weights[criterion] for criterion in self.data.index) for alternative in self.data.columns]
-        optimal_alternatives = data_with_common_criterion.columns[data_with_common_criterion.loc['Взвешенное произведение критериев'] == data_with_common_criterion.loc['Взвешенное произведение критериев'].max()].tolist()
+        data_with_common_criterion.loc['Взвешенное произведение критериев', :] = products
+        optimal_alternatives = self.data.columns[self.__products_optimum__(signs, log_products)].tolist() if len(log_products) > 0 else []
         
         dump = {
             'data_with_common_criterion': data_with_common_criterion,
+            'product_signs': pd.Series(signs, index=self.data.columns),
+            'log_weighted_products': pd.Series(log_products, index=self.data.columns),
             'optimal_alternatives': optimal_alternatives
         }
 
         return optimal_alternatives, dump
 
-    def __main_criterion__(self, thresholds):
+    def __thresholds_relevance__(self, thresholds):
+        values = self.__statistics__()['values']
+
+        relevant = np.ones(len(self.data.columns), dtype=bool)
+        for criterion, threshold in thresholds.items():
+            relevant &= values[self.data.index.get_loc(criterion)] >= threshold
+        return relevant
+
+    def __main_relevance__(self, thresholds):
         weights = {criterion: 1 for criterion in self.data.index} if self.weights is None else self.weights
         main = [criterion for criterion in weights if weights[criterion] == max(weights.values())]
+        values = self.__statistics__()['values']
 
-        relevent_alternatives_data = self.data[[
-            alternative for alternative in self.data.columns 
-            if all(self.data[alternative].loc[criterion] >= threshold 
-                   for criterion, threshold in thresholds.items())
-                   ]]
-        
-        optimal_alternatives = relevent_alternatives_data[[
-            alternative for alternative in relevent_alternatives_data.columns 
-            if (relevent_alternatives_data[alternative].loc[main] == relevent_alternatives_data.loc[main].max().max()).item()
-                   ]]
+        return main, values[self.data.index.get_loc(main[0])], self.__thresholds_relevance__(thresholds)
+
+    def __main_criterion__(self, thresholds):
+        main, main_values, relevant = self.__main_relevance__(thresholds)
+        relevent_alternatives_data = self.data.loc[:, relevant]
+
+        main_values = main_values[relevant]
+        optimal_alternatives = relevent_alternatives_data.columns[main_values == main_values.max()].tolist() if relevant.any() else []
         
         dump = {
             'relevent_alternatives_data': relevent_alternatives_data,
@@ -192,22 +385,37 @@ class DecisionMaking:
 
         return optimal_alternatives, dump
         
-    def __lexicographic_equal__(self):
-        weights = {criterion: 1 for criterion in self.data.index} if self.weights is None else self.weights
-        prioritet = sorted(weights, key=weights.get, reverse=True)
-
-        prioritet_data = self.data.copy()
+    def __lexicographic__(self, thresholds=None, prioritet=None):
+        # Отбор сужает массив индексов оставшихся альтернатив, история хранит только эти индексы
+        if prioritet is None:
+            weights = {criterion: 1 for criterion in self.data.index} if self.weights is None else self.weights
+            prioritet = sorted(weights, key=weights.get, reverse=True)
+        values = self.__statistics__()['values']
+
+        surviving = np.arange(len(self.data.columns))
         criterions_history = {}
         for criterion in prioritet:
-            prioritet_data = prioritet_data[prioritet_data.columns[prioritet_data.loc[criterion] == prioritet_data.loc[criterion].max()].tolist()]
-            criterions_history[criterion] = prioritet_data
+            if len(surviving) == 0:
+                break
 
-            if len(prioritet_data.columns) == 1:
+            criterion_values = values[self.data.index.get_loc(criterion), surviving]
+            if thresholds is None:
+                surviving = surviving[criterion_values == criterion_values.max()]
+            else:
+                surviving = surviving[abs(criterion_values - criterion_values.max()) <= thresholds[criterion]]
+            criterions_history[criterion] = surviving
+
+            if len(surviving) == 1:
                 break
-        
-        optimal_alternatives = prioritet_data.columns
+
+        return surviving, criterions_history
+
+    def __lexicographic_equal__(self):
+        surviving, criterions_history = self.__lexicographic__()
+        optimal_alternatives = self.data.columns[surviving].tolist()
         
         dump = {
+            'data': self.data,
             'criterions_history': criterions_history,
             'optimal_alternatives': optimal_alternatives
         }
@@ -215,36 +423,122 @@ class DecisionMaking:
         return optimal_alternatives, dump
 
     def __lexicographic_quasiequal__(self, thresholds):
-        weights = {criterion: 1 for criterion in self.data.index} if self.weights is None else self.weights
-        prioritet = sorted(weights, key=weights.get, reverse=True)
-
-        prioritet_data = self.data.copy()
-        criterions_history = {}
-        for criterion in prioritet:
-            prioritet_data = prioritet_data[prioritet_data.columns[abs(prioritet_data.loc[criterion] - prioritet_data.loc[criterion].max()) <= thresholds[criterion]].tolist()]
-            criterions_history[criterion] = prioritet_data
-
-            if len(prioritet_data.columns) == 1:
-                break
-        
-        optimal_alternatives = prioritet_data.columns
+        surviving, criterions_history = self.__lexicographic__(thresholds)
+        optimal_alternatives = self.data.columns[surviving].tolist()
         
         dump = {
             'thresholds': thresholds,
+            'data': self.data,
             'criterions_history': criterions_history,
             'optimal_alternatives': optimal_alternatives
         }
 
         return optimal_alternatives, dump
 
+    """Ранжирование"""
+    def __pareto_dominators_count__(self, values):
+        counts = np.empty(len(values))
+        rows = max(1, self.block_elements // max(1, len(values)))
+        for start in range(0, len(values), rows):
+            counts[start:start + rows] = self.__dominance_matrix__(values[start:start + rows], values).sum(axis=1)
+        return counts
+
+    def __lexicographic_scores__(self, thresholds=None):
+        # Номер группы альтернатив с одинаковыми значениями критериев в лексикографическом порядке
+        weights = {criterion: 1 for criterion in self.data.index} if self.weights is None else self.weights
+        prioritet = sorted(weights, key=weights.get, reverse=True)
+        values = self.__statistics__()['values'][[self.data.index.get_loc(criterion) for criterion in prioritet]]
+
+        order = np.lexsort(-values[::-1])
+        ordered_values = values[:, order]
+        new_group = np.r_[True, (ordered_values[:, 1:] != ordered_values[:, :-1]).any(axis=0)]
+        ranks = np.empty(len(order))
+        ranks[order] = np.cumsum(new_group)
+
+        if thresholds is None:
+            return -ranks
+
+        # Для квазиравенства в первую очередь учитывается число пройденных уровней отсечения
+        depth = np.zeros(len(order))
+        for level, surviving in enumerate(self.__lexicographic__(thresholds)[1].values(), 1):
+            depth[surviving] = level
+        return depth * (len(order) + 1) - ranks
+
+    def __scores__(self, parameters):
+        # Оценки альтернатив по каждому принципу: чем больше оценка, тем лучше альтернатива
+        statistics = self.__statistics__()
+        weights = {criterion: 1 for criterion in self.data.index} if self.weights is None else self.weights
+        metric_p = parameters.get('metric_p', 2)
+
+        idp = pd.Series(statistics['max'], index=self.data.index) if parameters['idp'] is None else pd.Series(parameters['idp'])
+        aidp = pd.Series(statistics['min'], index=self.data.index) if parameters['aidp'] is None else pd.Series(parameters['aidp'])
+
+        scores = {
+            'idp': -self.__distances__(idp, parameters['metric'], metric_p),
+            'aidp': self.__distances__(aidp, parameters['metric'], metric_p),
+            'pareto': -self.__pareto_dominators_count__(statistics['values'].T),
+            'equal': -self.__equality_violation__(),
+            'qequal': -self.__equality_violation__(parameters['sigma']),
+            'absolute': statistics['weighted_sums'],
+            'relative': self.__products_ranks__(statistics['product_signs'], statistics['log_weighted_products']),
+            'main': None,
+            'lex_equal': self.__lexicographic_scores__(),
+            'lex_qequal': self.__lexicographic_scores__(parameters['quasi_equal_thresholds'])
+        }
+        if len([weight for weight in weights.values() if weight == max(weights.values())]) == 1:
+            _, main_values, relevant = self.__main_relevance__(parameters['main_thresholds'])
+            scores['main'] = np.where(relevant, main_values, -np.inf)
+
+        return scores
+
+    def __top_k__(self, scores, k=None):
+        # Выбор k лучших альтернатив за O(N) через argpartition, сортируются только выбранные
+        scores = np.where(np.isnan(scores), -np.inf, scores)
+        if k is None or k >= len(scores):
+            top = np.arange(len(scores))
+        else:
+            top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.lexsort((top, -scores[top]))]
+
+        # Места с учетом равенства оценок (одинаковые оценки - одинаковое место)
+        places = np.searchsorted(-scores[top], -scores[top], side='left') + 1
+        return top, places
+
+    def rank(self, parameters, k=None):
+        rankings = {}
+        for method, scores in self.__scores__(parameters).items():
+            if scores is None:
+                rankings[method] = None
+                continue
+
+            top, places = self.__top_k__(scores, k)
+            rankings[method] = pd.DataFrame({'Место': places, 'Оценка': scores[top]}, index=self.data.columns[top])
+
+        return rankings
+
+    def __consensus_rank__(self, parameters):
+        # Средний по принципам номер места альтернативы
+        places = []
+        for scores in self.__scores__(parameters).values():
+            if scores is None:
+                continue
+
+            top, top_places = self.__top_k__(scores)
+            method_places = np.empty(len(top))
+            method_places[top] = top_places
+            places.append(method_places)
+
+        return pd.Series(np.mean(places, axis=0), index=self.data.columns)
+
     """Перебор принципов"""
     def calculate(self, parameters):
         related_information = {}
         optimal_alternatives = {}
         weights = {criterion: 1 for criterion in self.data.index} if self.weights is None else self.weights
 
-        optimal_alternatives['idp'], related_information['idp'] = self.__ideal_point__(idp=parameters['idp'], metric=parameters['metric'])
-        optimal_alternatives['aidp'], related_information['aidp'] = self.__antiideal_point__(aidp=parameters['aidp'], metric=parameters['metric'])
+        metric_p = parameters.get('metric_p', 2)
+        optimal_alternatives['idp'], related_information['idp'] = self.__ideal_point__(idp=parameters['idp'], metric=parameters['metric'], metric_p=metric_p)
+        optimal_alternatives['aidp'], related_information['aidp'] = self.__antiideal_point__(aidp=parameters['aidp'], metric=parameters['metric'], metric_p=metric_p)
         optimal_alternatives['pareto'], related_information['pareto'] = self.__Pareto__()
         optimal_alternatives['equal'], related_information['equal'] = self.__equal_principle__()
         optimal_alternatives['qequal'], related_information['qequal'] = self.__quasi_equal_principle__(sigma=parameters['sigma'])
@@ -258,25 +552,130 @@ class DecisionMaking:
         optimal_alternatives['lex_equal'], related_information['lex_equal'] = self.__lexicographic_equal__()
         optimal_alternatives['lex_qequal'], related_information['lex_qequal'] = self.__lexicographic_quasiequal__(thresholds=parameters['quasi_equal_thresholds'])
 
-        result_data = pd.DataFrame(index=optimal_alternatives.keys(), columns=self.data.columns)
-        for method, opt_alternatives in optimal_alternatives.items():
-            if method == 'main' and opt_alternatives is None:
-                opt_alternatives = []
-            for alternative in result_data.columns:
-                result_data.loc[method, alternative] = '✓' if alternative in opt_alternatives else '✗'
-        result_data.rename(index=self.methods_vocabulary, inplace=True)
+        alternatives = self.data.columns.to_numpy()
+        membership = pd.DataFrame(
+            np.vstack([np.isin(alternatives, [] if opt_alternatives is None else list(opt_alternatives)) for opt_alternatives in optimal_alternatives.values()]),
+            index=[self.methods_vocabulary[method] for method in optimal_alternatives],
+            columns=self.data.columns
+        )
+        votes = membership.sum(axis=0)
+        related_information['membership'] = membership
+        related_information['votes'] = votes
+
+        if parameters.get('top_k') is not None:
+            related_information['rankings'] = self.rank(parameters, k=parameters['top_k'])
         
-        result_data.loc['Количество методов'] = result_data.apply(lambda col: (col == '✓').sum())
-        related_information['result'] = result_data
-        
-        optimal_alternatives = [
-            alternative for alternative in result_data.columns 
-            if (result_data[alternative].loc['Количество методов'] == result_data.loc['Количество методов'].max())
-        ]
+        if parameters.get('aggregation', 'votes') == 'rank':
+            consensus_rank = self.__consensus_rank__(parameters)
+            related_information['consensus_rank'] = consensus_rank
+            optimal_alternatives = self.data.columns[consensus_rank == consensus_rank.min()].tolist()
+        else:
+            optimal_alternatives = self.data.columns[votes == votes.max()].tolist()
         related_information['optimal_alternatives'] = optimal_alternatives
 
         return optimal_alternatives, related_information
 
+    @staticmethod
+    def render_pairwise_differences(weighted_values):
+        # Таблица попарных разностей взвешенных значений критериев формируется только для отчета
+        values = weighted_values.to_numpy(dtype=float)
+        differences = np.abs(values[:, None, :] - values[None, :, :])
+        first, second = np.triu_indices(len(weighted_values.index), k=1)
+
+        pairwise_data = pd.DataFrame(
+            differences[first, second],
+            index=[f'Разница критериев {weighted_values.index[i]} и {weighted_values.index[j]}' for i, j in zip(first, second)],
+            columns=weighted_values.columns
+        )
+
+        return pd.concat([weighted_values, pairwise_data])
+
+    @staticmethod
+    def criterions_history_view(dump, criterion):
+        # Данные, оставшиеся после отсечения по критерию, выбираются из исходной таблицы по сохраненным индексам
+        return dump['data'].iloc[:, dump['criterions_history'][criterion]]
+
+    @staticmethod
+    def render_result(membership):
+        # Таблица ✓/✗ формируется только для отчета
+        result_data = pd.DataFrame(np.where(membership.to_numpy(), '✓', '✗').astype(object), index=membership.index, columns=membership.columns)
+        result_data.loc['Количество методов'] = membership.sum(axis=0)
+        return result_data
+
+    """Пакетный расчет по набору векторов весов"""
+    def calculate_batch(self, weights, parameters):
+        # weights - матрица сценарии x критерии: DataFrame со столбцами-критериями или ndarray в порядке self.data.index.
+        # При равенстве весов приоритет лексикографических принципов определяется порядком критериев в self.data.index
+        if isinstance(weights, pd.DataFrame):
+            weights = weights.loc[:, self.data.index].to_numpy(dtype=float)
+        weights = np.atleast_2d(np.asarray(weights, dtype=float))
+        if callable(parameters['metric']):
+            raise ValueError("Пакетный расчет не поддерживает пользовательскую метрику")
+
+        statistics = self.__statistics__()
+        values = statistics['values']
+        methods = list(self.methods_vocabulary)
+        metric_p = parameters.get('metric_p', 2)
+        scenarios_number, alternatives_number = len(weights), values.shape[1]
+
+        membership = np.zeros((len(methods), scenarios_number, alternatives_number), dtype=bool)
+
+        idp = pd.Series(statistics['max'], index=self.data.index) if parameters['idp'] is None else pd.Series(parameters['idp'])
+        distances = self.__weighted_distances__(weights, idp, parameters['metric'], metric_p)
+        membership[methods.index('idp')] = distances == distances.min(axis=1, keepdims=True)
+
+        aidp = pd.Series(statistics['min'], index=self.data.index) if parameters['aidp'] is None else pd.Series(parameters['aidp'])
+        distances = self.__weighted_distances__(weights, aidp, parameters['metric'], metric_p)
+        membership[methods.index('aidp')] = distances == distances.max(axis=1, keepdims=True)
+
+        # Фронт Парето от весов не зависит и сохраняется для повторных вызовов
+        if 'pareto_front' not in statistics:
+            statistics['pareto_front'] = self.__pareto_front_mask__(values.T)
+        membership[methods.index('pareto')] = statistics['pareto_front'][None, :]
+
+        sums = np.empty((scenarios_number, alternatives_number))
+        product_signs = np.empty((scenarios_number, alternatives_number))
+        log_products = np.empty((scenarios_number, alternatives_number))
+        step = max(1, self.block_elements // max(1, values.size))
+        for start in range(0, scenarios_number, step):
+            block_weights = weights[start:start + step, :, None]
+            weighted = block_weights * values[None, :, :]
+            membership[methods.index('equal'), start:start + step] = self.__equality_violation__(weighted=weighted) <= 0
+            membership[methods.index('qequal'), start:start + step] = self.__equality_violation__(parameters['sigma'], weighted=weighted) <= 0
+            sums[start:start + step] = weighted.sum(axis=1)
+            product_signs[start:start + step], log_products[start:start + step] = self.__signed_log_products__(values[None, :, :], block_weights)
+
+        membership[methods.index('absolute')] = sums == sums.max(axis=1, keepdims=True)
+        membership[methods.index('relative')] = self.__products_optimum__(product_signs, log_products)
+
+        # Принцип главного критерия применяется только в сценариях с единственным наибольшим весом
+        unique_main = (weights == weights.max(axis=1, keepdims=True)).sum(axis=1) == 1
+        relevant = self.__thresholds_relevance__(parameters['main_thresholds'])
+        main_values = values[weights.argmax(axis=1)]
+        relevant_main_values = np.where(relevant[None, :], main_values, -np.inf)
+        membership[methods.index('main')] = unique_main[:, None] & relevant[None, :] & (main_values == relevant_main_values.max(axis=1, keepdims=True))
+
+        # Результат лексикографических принципов зависит только от порядка приоритетов
+        orders, inverse = np.unique(np.argsort(-weights, axis=1, kind='stable'), axis=0, return_inverse=True)
+        for order_number, order in enumerate(orders):
+            prioritet = self.data.index[order].tolist()
+            scenarios = inverse.ravel() == order_number
+            membership[methods.index('lex_equal'), scenarios] = np.isin(np.arange(alternatives_number), self.__lexicographic__(None, prioritet)[0])
+            membership[methods.index('lex_qequal'), scenarios] = np.isin(np.arange(alternatives_number), self.__lexicographic__(parameters['quasi_equal_thresholds'], prioritet)[0])
+
+        votes = membership.sum(axis=0)
+        optimal = votes == votes.max(axis=1, keepdims=True)
+
+        related_information = {
+            'methods': methods,
+            'alternatives': self.data.columns,
+            'membership': membership,
+            'votes': votes,
+            'optimal': optimal
+        }
+
+        return optimal, related_information
+
     """Расчет на основе целевой функции"""
     def uncertain_calculate(self, parameters):
         related_information = {}
@@ -331,8 +730,10 @@ class DecisionMaking:
         elif parameters['optimization_principle'] == "Принцип относительной уступки":
             _, related_information['restriction'] = self.__relative_concession__()
 
-            restriction_values = related_information['restriction']['data_with_common_criterion']
-            relevant_alternatives = restriction_values.columns[restriction_values.loc['Взвешенное произведение критериев'] > parameters['constraint_value']]
+            # Сравнение с порогом выполняется по знаку и логарифму модуля, так как произведение может быть непредставимо
+            restriction = related_information['restriction']
+            greater = self.__products_greater__(restriction['product_signs'].to_numpy(), restriction['log_weighted_products'].to_numpy(), parameters['constraint_value'])
+            relevant_alternatives = restriction['log_weighted_products'].index[greater]
             
             target_function = common_data.loc[target_function_criterion, relevant_alternatives]
             self.data = target_function
@@ -4,6 +4,10 @@ from scipy.optimize import fsolve
 from scipy import integrate
 
 class FuzzyLogic:
+    inference_grid_size = 1001      # Число узлов равномерной сетки на [0, 1] для дефаззификации в нечетких системах
+    inference_check = False         # Сверять результат нечеткого вывода с расчетом через integrate.quad
+    inference_tolerance = 10**-3    # Допустимое отклонение от расчета через integrate.quad
+
     def __init__(self, data):
         self.task_type = data['task_type']
 
@@ -133,7 +137,60 @@ class FuzzyLogic:
         matrix.loc['Показатель', :] = [self.__get_square_centre__(matrix[alternative]) for alternative in matrix.columns]
         return matrix
 
-    def __fuzzy_systems__(self):
+    """Нечеткий вывод"""
+    @staticmethod
+    def __triangular__(x, start, peak, end):
+        # Треугольные функции принадлежности над массивами, вырожденная сторона треугольника дает 1
+        left = (x >= start) & (x <= peak)
+        right = (x >= peak) & (x <= end) & ~left
+        with np.errstate(divide='ignore', invalid='ignore'):
+            left_value = np.where(peak == start, 1.0, (x - start) / (peak - start))
+            right_value = np.where(end == peak, 1.0, (end - x) / (end - peak))
+        return np.where(left, left_value, np.where(right, right_value, 0.0))
+
+    def __compliance_indexer__(self, values):
+        indexer = self.compliance.columns.get_indexer(values)
+        if (indexer < 0).any():
+            raise ValueError("Некорректная степень соответствия в правилах")
+        return indexer
+
+    def __grid_inference__(self):
+        start, peak, end = (self.compliance.loc[row].to_numpy(dtype=float)[:, None] for row in self.compliance.index[:3])
+        alternatives = self.membership_data.index
+
+        # Степени выполнения правил (правила x альтернативы) - минимум по критериям
+        strengths = np.ones((len(self.rules.index), len(alternatives)))
+        for criterion in self.membership_data.columns:
+            memberships = self.__triangular__(self.membership_data[criterion].to_numpy(dtype=float)[None, :], start, peak, end)
+            np.minimum(strengths, memberships[self.__compliance_indexer__(self.rules[criterion])], out=strengths)
+
+        # Сетка выходной оценки дополняется вершинами треугольников, чтобы их изломы и разрывы попадали в узлы
+        vertices = np.clip(np.concatenate([start, peak, end]).ravel(), 0.0, 1.0)
+        grid = np.union1d(np.linspace(0.0, 1.0, self.inference_grid_size), vertices)
+        result_terms = self.__compliance_indexer__(self.rules['result'])
+
+        def result_function(x):
+            # Итоговая функция принадлежности каждой альтернативы - максимум по правилам
+            outputs = self.__triangular__(x[None, :], start, peak, end)[result_terms]
+            values = np.zeros((len(alternatives), len(x)))
+            for rule_output, rule_strengths in zip(outputs, strengths):
+                np.maximum(values, rule_strengths[:, None] * rule_output[None, :], out=values)
+            return values
+
+        # Значения у концов каждого отрезка берутся изнутри отрезка, на отрезке функция считается линейной
+        # и интегралы от нее и от x * f(x) вычисляются точно для всех альтернатив сразу
+        left, right = grid[:-1], grid[1:]
+        left_values = result_function(np.nextafter(left, np.inf))
+        right_values = result_function(np.nextafter(right, -np.inf))
+        steps = right - left
+        integrate_value = (left_values + right_values) @ steps / 2
+        weighted_integrate_value = (left_values * (2 * left + right) + right_values * (left + 2 * right)) @ steps / 6
+        if (integrate_value <= 0).any():
+            raise ValueError("Некорректные правила: для альтернативы не выполняется ни одно правило")
+
+        return pd.Series(weighted_integrate_value / integrate_value, index=alternatives)
+
+    def __quad_inference__(self):
         start = self.compliance.index[0]
         peak = self.compliance.index[1]
         end = self.compliance.index[2]
@@ -165,13 +222,25 @@ class FuzzyLogic:
             weighted_integrate_value, _ = integrate.quad(lambda x: x * result_function(x), 0, 1)
             integrate_value, _ = integrate.quad(result_function, 0, 1)
 
-            alter_values[alternative] = [weighted_integrate_value / integrate_value]
+            alter_values[alternative] = weighted_integrate_value / integrate_value
+
+        return pd.Series(alter_values)
+
+    def __fuzzy_systems__(self):
+        measure = self.__grid_inference__()
+
+        # При проверке результат остается сеточным, расхождение с integrate.quad только сообщается
+        deviation = None
+        if self.inference_check:
+            deviation = float((measure - self.__quad_inference__()).abs().max())
 
-        data_with_measure = pd.DataFrame(alter_values, index=['Показатель'])
+        data_with_measure = pd.DataFrame([measure.to_numpy()], index=['Показатель'], columns=measure.index)
 
         dump = {
             'data_with_measure': data_with_measure,
-            'optimal_alternatives': data_with_measure.columns[data_with_measure.loc['Показатель'] == data_with_measure.loc['Показатель'].max()].tolist()
+            'optimal_alternatives': data_with_measure.columns[data_with_measure.loc['Показатель'] == data_with_measure.loc['Показатель'].max()].tolist(),
+            'inference_deviation': deviation,
+            'inference_within_tolerance': None if deviation is None else deviation <= self.inference_tolerance
         }
 
         return dump
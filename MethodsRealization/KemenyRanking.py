@@ -0,0 +1,116 @@
+import numpy as np
+from time import perf_counter
+
+
+class KemenyRanking:
+    exact_limit = 16                # Для числа альтернатив не больше порога решение точное (динамика по подмножествам)
+    time_budget = 1.0               # Предельное время на локальный поиск для большого числа альтернатив, сек
+    max_stall = 20                  # Перезапуски прекращаются после стольких подряд без улучшения
+
+    def __init__(self, signs, mode='median', seed=0):
+        # signs - тензор эксперт x alter2 x alter1, элемент - sign(alter1 - alter2)
+        self.alternatives_number = signs.shape[1]
+        self.rng = np.random.default_rng(seed)
+
+        # cost[i, j] - расстояние до всех экспертов от постановки альтернативы i раньше альтернативы j
+        disagreement = np.abs(1 - signs)
+        if mode == 'mean':
+            disagreement = disagreement ** 2
+        self.cost = disagreement.sum(axis=0).T.astype(float)
+
+    """Стоимость ранжировки"""
+    def __ranking_cost__(self, order):
+        positions = np.empty(self.alternatives_number, dtype=int)
+        positions[order] = np.arange(self.alternatives_number)
+        return float(self.cost[positions[:, None] < positions[None, :]].sum())
+
+    """Точное решение"""
+    def __exact__(self):
+        n = self.alternatives_number
+        masks = np.arange(1 << n)
+        bits = 1 << np.arange(n)
+
+        # insertion[mask, k] - стоимость постановки k после всех альтернатив из mask
+        insertion = np.zeros((1 << n, n))
+        for b in range(n):
+            insertion[1 << b: 1 << (b + 1)] = insertion[:1 << b] + self.cost[b]
+
+        popcount = ((masks[:, None] & bits) != 0).sum(axis=1)
+        best = np.full(1 << n, np.inf)
+        best[0] = 0
+        for size in range(1, n + 1):
+            layer = masks[popcount == size]
+            included = (layer[:, None] & bits) != 0
+            previous = layer[:, None] ^ bits
+            candidates = np.where(included, best[np.where(included, previous, 0)] + insertion[np.where(included, previous, 0), np.arange(n)], np.inf)
+            best[layer] = candidates.min(axis=1)
+
+        # Восстановление порядка с конца
+        order = []
+        mask = (1 << n) - 1
+        while mask:
+            for k in range(n):
+                if mask & bits[k] and np.isclose(best[mask], best[mask ^ bits[k]] + insertion[mask ^ bits[k], k]):
+                    order.append(k)
+                    mask ^= bits[k]
+                    break
+
+        return np.array(order[::-1]), float(best[-1])
+
+    """Эвристика"""
+    def __borda__(self):
+        # Начальное приближение: альтернативы по убыванию выигрыша от постановки раньше остальных
+        return np.argsort((self.cost.T - self.cost).sum(axis=1), kind='stable')[::-1]
+
+    def __local_search__(self, order):
+        improved = True
+        while improved:
+            improved = False
+            for element in order.copy():
+                position = int(np.flatnonzero(order == element)[0])
+                rest = np.delete(order, position)
+
+                # Стоимость вставки на каждое место: предшественники и последователи element
+                before = np.concatenate(([0], np.cumsum(self.cost[rest, element])))
+                after = np.concatenate((np.cumsum(self.cost[element, rest][::-1])[::-1], [0]))
+                insertion = before + after
+
+                best_position = int(np.argmin(insertion))
+                if insertion[best_position] < insertion[position] - 10**-9:
+                    order = np.insert(rest, best_position, element)
+                    improved = True
+
+        return order
+
+    def __heuristic__(self):
+        deadline = perf_counter() + self.time_budget
+
+        best_order = self.__local_search__(self.__borda__())
+        best_cost = self.__ranking_cost__(best_order)
+
+        # Перезапуски из возмущенного лучшего решения (разворот случайного отрезка) до серии неудачных или исчерпания времени
+        stall = 0
+        while stall < self.max_stall and perf_counter() < deadline:
+            stall += 1
+            order = best_order.copy()
+            start, end = np.sort(self.rng.choice(self.alternatives_number + 1, 2, replace=False))
+            order[start:end] = order[start:end][::-1]
+
+            order = self.__local_search__(order)
+            cost = self.__ranking_cost__(order)
+            if cost < best_cost:
+                best_order, best_cost = order, cost
+                stall = 0
+
+        return best_order, best_cost
+
+    def calculate(self):
+        if self.alternatives_number <= 1:
+            return np.arange(self.alternatives_number), 0.0, True
+
+        if self.alternatives_number <= self.exact_limit:
+            order, cost = self.__exact__()
+            return order, cost, True
+
+        order, cost = self.__heuristic__()
+        return order, cost, False
@@ -0,0 +1,92 @@
+import numpy as np
+
+
+class Normalization:
+    floor_ratio = 10**-4            # Значения не выше доли от максимума заменяются этой долей
+
+    """Методы нормализации"""
+    # Все методы работают с целым массивом: axis=1 - по строкам (критериям), axis=None - по всему массиву
+    # statistics - заранее посчитанные (минимум, максимум), например при обработке данных по частям
+    @staticmethod
+    def __statistics__(values, axis, statistics):
+        if statistics is not None:
+            return statistics
+        return values.min(axis=axis, keepdims=True), values.max(axis=axis, keepdims=True)
+
+    @staticmethod
+    def relative(values, axis=1, zero_range='zero', statistics=None):
+        min_value, max_value = Normalization.__statistics__(values, axis, statistics)
+        value = np.where(max_value > 0.0, np.abs(max_value), np.where(max_value < 0.0, np.abs(min_value), np.where(min_value != 0.0, np.abs(min_value), max_value + 10**-6)))
+        return values / value
+
+    @staticmethod
+    def comparative(values, axis=1, zero_range='zero', statistics=None):
+        min_value, _ = Normalization.__statistics__(values, axis, statistics)
+        return values - min_value
+
+    @staticmethod
+    def natural(values, axis=1, zero_range='zero', statistics=None):
+        # zero_range: при совпадении максимума и минимума 'zero' - нули, 'max' - деление на максимум (или 10^-6 при нулевом)
+        min_value, max_value = Normalization.__statistics__(values, axis, statistics)
+        value_range = max_value - min_value
+        if zero_range == 'zero':
+            return np.where(value_range != 0, values / np.where(value_range != 0, value_range, 1), 0.0)
+        elif zero_range == 'max':
+            return values / np.where(value_range != 0, value_range, np.where(max_value != 0, max_value, max_value + 10**-6))
+        raise ValueError("Некорректный способ обработки нулевого диапазона")
+
+    @staticmethod
+    def full(values, axis=1, zero_range='zero', statistics=None):
+        min_value, max_value = Normalization.__statistics__(values, axis, statistics)
+        value_range = max_value - min_value
+        return np.where(value_range != 0, (values - min_value) / np.where(value_range != 0, value_range, 1), 0.0)
+
+    @staticmethod
+    def none(values, axis=1, zero_range='zero', statistics=None):
+        return values
+
+    methods = {
+        'Относительная нормализация': 'relative',
+        'Сравнительная нормализация': 'comparative',
+        'Естественная нормализация': 'natural',
+        'Полная нормализация': 'full',
+        'Нет нормализации': 'none'
+    }
+
+    @staticmethod
+    def normalize(values, method, axis=1, zero_range='zero', statistics=None):
+        if method not in Normalization.methods:
+            raise ValueError("Некорректный метод нормализации")
+        return getattr(Normalization, Normalization.methods[method])(values, axis=axis, zero_range=zero_range, statistics=statistics)
+
+    @staticmethod
+    def normalize_rows(values, methods, zero_range='zero', out=None, statistics=None):
+        # Строки с одинаковым методом нормализуются одной операцией, out=values - нормализация на месте
+        result = np.empty_like(values, dtype=float) if out is None else out
+        methods = np.asarray(methods)
+        for method in np.unique(methods):
+            rows = methods == method
+            rows_statistics = None if statistics is None else (statistics[0][rows], statistics[1][rows])
+            result[rows] = Normalization.normalize(values[rows], method, axis=1, zero_range=zero_range, statistics=rows_statistics)
+        return result
+
+    @staticmethod
+    def bounds_statistics(min_value, max_value, methods, direction_changing=None, zero_range='zero'):
+        # Статистики для обработки по частям по границам строк, собранным первым проходом: смена направления
+        # и нормализация монотонны по каждой строке, поэтому границы после них пересчитываются по границам
+        bounds = np.stack([np.atleast_1d(min_value), np.atleast_1d(max_value)], axis=1).astype(float)
+        if direction_changing is not None:
+            bounds = direction_changing(bounds)
+        min_value, max_value = bounds.min(axis=1, keepdims=True), bounds.max(axis=1, keepdims=True)
+        normalized_max = Normalization.normalize_rows(max_value.copy(), methods, zero_range=zero_range, statistics=(min_value, max_value))
+        return min_value, max_value, normalized_max
+
+    """Ограничение снизу"""
+    @staticmethod
+    def floor(values, axis=1, absolute=False, out=None, max_value=None):
+        threshold = (values.max(axis=axis, keepdims=True) if max_value is None else max_value) * Normalization.floor_ratio
+        if out is None:
+            return np.where((np.abs(values) if absolute else values) <= threshold, threshold, values)
+
+        np.copyto(out, np.broadcast_to(threshold, out.shape), where=(np.abs(values) if absolute else values) <= threshold)
+        return out
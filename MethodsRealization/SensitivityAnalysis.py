@@ -0,0 +1,135 @@
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from MethodsRealization.DecisionMaking import DecisionMaking
+
+# DecisionMaking процесса пула: задается только инициализатором пула, статистики данных и фронт Парето считаются один раз на процесс
+worker_decision_making = None
+
+
+class SensitivityAnalysis:
+    default_params = {
+        'samples': 10000,
+        'batch_size': 500,
+        'concentration': 100,
+        'threshold_noise': 0.0,
+        'processes': None,
+        'tolerance': 0.005,
+        'min_samples': 1000,
+        'confidence': 0.9,
+        'seed': None
+    }
+
+    def __init__(self, data, weights, parameters):
+        self.data = data
+        self.weights = {criterion: 1 for criterion in data.index} if weights is None else weights
+        self.parameters = parameters
+
+    """Генерация сценариев"""
+    def __sample_weights__(self, rng, size, concentration):
+        # Распределение Дирихле с центром в заданных весах, большая концентрация - меньший разброс
+        weights = np.array([self.weights[criterion] for criterion in self.data.index], dtype=float)
+        total = weights.sum()
+        alpha = np.maximum(concentration * weights / total, 10**-9)
+
+        return rng.dirichlet(alpha, size) * total
+
+    def __sample_parameters__(self, rng, threshold_noise):
+        # Пороги возмущаются мультипликативно, одно возмущение на пакет сценариев
+        if threshold_noise == 0:
+            return self.parameters
+
+        parameters = dict(self.parameters)
+        for key in ['main_thresholds', 'quasi_equal_thresholds']:
+            parameters[key] = {
+                criterion: threshold * (1 + threshold_noise * rng.standard_normal())
+                for criterion, threshold in self.parameters[key].items()
+            }
+        return parameters
+
+    """Расчет пакета сценариев"""
+    @staticmethod
+    def init_worker(data):
+        # Данные передаются в процесс один раз, пакеты содержат только параметры и веса
+        global worker_decision_making
+        worker_decision_making = DecisionMaking(data)
+
+    @staticmethod
+    def evaluate_batch(task, decision_making=None):
+        # Без decision_making пакет считается в процессе пула
+        parameters, weights = task
+        decision_making = worker_decision_making if decision_making is None else decision_making
+        optimal, related_information = decision_making.calculate_batch(weights, parameters)
+
+        # Место альтернативы в сценарии по числу принципов (одинаковое число - одинаковое место)
+        votes = related_information['votes']
+        counts = (votes[:, :, None] == np.arange(len(related_information['methods']) + 1)).sum(axis=1)
+        better = counts[:, ::-1].cumsum(axis=1)[:, ::-1] - counts
+        ranks = 1 + np.take_along_axis(better, votes, axis=1)
+
+        return optimal, ranks
+
+    def __rank_interval__(self, histogram, quantile):
+        cumulative = histogram.cumsum(axis=1) / histogram.sum(axis=1, keepdims=True)
+        return (cumulative < quantile).sum(axis=1) + 1
+
+    def calculate(self, params=None):
+        params = {**self.default_params, **({} if params is None else params)}
+        rng = np.random.default_rng(params['seed'])
+        alternatives_number = len(self.data.columns)
+
+        wins = np.zeros(alternatives_number)
+        rank_histogram = np.zeros((alternatives_number, alternatives_number), dtype=np.int64)
+        samples = 0
+        converged = False
+        standard_error = np.inf
+
+        if params['processes']:
+            executor = ProcessPoolExecutor(params['processes'], initializer=SensitivityAnalysis.init_worker, initargs=(self.data,))
+        else:
+            executor = None
+            evaluate_batch = partial(SensitivityAnalysis.evaluate_batch, decision_making=DecisionMaking(self.data))
+        try:
+            while samples < params['samples']:
+                # Пакеты одного раунда считаются параллельно, после раунда проверяется сходимость оценок
+                tasks = []
+                for _ in range(params['processes'] or 1):
+                    size = min(params['batch_size'], params['samples'] - samples - sum(len(task[1]) for task in tasks))
+                    if size <= 0:
+                        break
+                    tasks.append((self.__sample_parameters__(rng, params['threshold_noise']), self.__sample_weights__(rng, size, params['concentration'])))
+
+                results = executor.map(SensitivityAnalysis.evaluate_batch, tasks) if executor is not None else map(evaluate_batch, tasks)
+                for optimal, ranks in results:
+                    wins += optimal.sum(axis=0)
+                    samples += len(optimal)
+                    np.add.at(rank_histogram, (np.broadcast_to(np.arange(alternatives_number), ranks.shape), ranks - 1), 1)
+
+                probabilities = wins / samples
+                standard_error = np.sqrt(probabilities * (1 - probabilities) / samples).max()
+                if samples >= params['min_samples'] and standard_error < params['tolerance']:
+                    converged = True
+                    break
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        tail = (1 - params['confidence']) / 2
+        result = pd.DataFrame({
+            'Вероятность оптимальности': wins / samples,
+            'Средний ранг': (rank_histogram * np.arange(1, alternatives_number + 1)).sum(axis=1) / samples,
+            'Нижняя граница ранга': self.__rank_interval__(rank_histogram, tail),
+            'Верхняя граница ранга': self.__rank_interval__(rank_histogram, 1 - tail)
+        }, index=self.data.columns)
+
+        dump = {
+            'samples': samples,
+            'converged': converged,
+            'standard_error': standard_error,
+            'rank_histogram': pd.DataFrame(rank_histogram, index=self.data.columns, columns=range(1, alternatives_number + 1)),
+            'params': params
+        }
+
+        return result, dump
@@ -0,0 +1,242 @@
+import numpy as np
+
+
+class ScenarioAccumulator:
+    # Потоковые взвешенные характеристики по состояниям (формулы Уэлфорда/Чана для объединения частей):
+    # среднее, дисперсия, минимум, максимум, максимальное сожаление и вероятность превышения порога
+    def __init__(self, threshold=None, normalized=True):
+        # normalized=False - веса считаются вероятностями как есть: ожидание - взвешенная сумма без деления на сумму весов
+        self.threshold = threshold
+        self.normalized = normalized
+        self.weight = None
+
+    def update(self, values, weights=None):
+        # values - (..., состояния, альтернативы), weights - (..., состояния), без весов состояния равновероятны
+        values = np.asarray(values, dtype=float)
+        weights = np.ones(values.shape[:-1]) if weights is None else np.asarray(weights, dtype=float)
+        state_weights = weights[..., :, None]
+
+        chunk_weight = weights.sum(axis=-1)[..., None]
+        chunk_mean = np.divide((state_weights * values).sum(axis=-2), chunk_weight, out=np.zeros(values.shape[:-2] + values.shape[-1:]), where=chunk_weight > 0)
+        chunk_m2 = (state_weights * (values - chunk_mean[..., None, :]) ** 2).sum(axis=-2)
+
+        if self.weight is None:
+            self.weight = chunk_weight
+            self.mean = chunk_mean
+            self.m2 = chunk_m2
+            self.min = values.min(axis=-2)
+            self.max = values.max(axis=-2)
+            self.regret = (values.max(axis=-1, keepdims=True) - values).max(axis=-2)
+            self.exceedance = None if self.threshold is None else (state_weights * (values >= self.threshold)).sum(axis=-2)
+            return self
+
+        total = self.weight + chunk_weight
+        delta = chunk_mean - self.mean
+        share = np.divide(chunk_weight, total, out=np.zeros_like(total), where=total > 0)
+        self.mean = self.mean + delta * share
+        self.m2 = self.m2 + chunk_m2 + delta ** 2 * self.weight * share
+        self.weight = total
+
+        np.minimum(self.min, values.min(axis=-2), out=self.min)
+        np.maximum(self.max, values.max(axis=-2), out=self.max)
+        np.maximum(self.regret, (values.max(axis=-1, keepdims=True) - values).max(axis=-2), out=self.regret)
+        if self.threshold is not None:
+            self.exceedance = self.exceedance + (state_weights * (values >= self.threshold)).sum(axis=-2)
+        return self
+
+    @property
+    def expectation(self):
+        return self.mean if self.normalized else self.mean * self.weight
+
+    @property
+    def variance(self):
+        return np.divide(self.m2, self.weight, out=np.zeros_like(self.m2), where=self.weight > 0)
+
+    def deviation(self, center=None):
+        # Среднеквадратичное отклонение от center, по умолчанию - от ожидания
+        center = self.expectation if center is None else center
+        if self.normalized:
+            return np.sqrt(self.variance + (self.mean - center) ** 2)
+        return np.sqrt(self.m2 + self.weight * (self.mean - center) ** 2)
+
+    @property
+    def exceedance_probability(self):
+        if not self.normalized:
+            return self.exceedance
+        return np.divide(self.exceedance, self.weight, out=np.zeros_like(self.exceedance), where=self.weight > 0)
+
+
+class UncertaintyKernels:
+    # Критерии снятия неопределенности над массивами (..., состояния, альтернативы),
+    # вероятности состояний - массив (..., состояния); результат - (..., альтернативы) и промежуточные массивы
+    @staticmethod
+    def __weights__(probabilities):
+        return np.asarray(probabilities, dtype=float)[..., :, None]
+
+    @staticmethod
+    def __accumulate__(matrix, probabilities):
+        # Ожидание, отклонение, минимум и максимум за один проход по состояниям
+        return ScenarioAccumulator(normalized=False).update(matrix, probabilities)
+
+    """Ситуация 1: Полная определенность"""
+    @staticmethod
+    def bayes_laplace(matrix, probabilities):
+        return UncertaintyKernels.bayes_laplace_moments(UncertaintyKernels.__accumulate__(matrix, probabilities))
+
+    @staticmethod
+    def mse(matrix, probabilities):
+        accumulator = UncertaintyKernels.__accumulate__(matrix, probabilities)
+        weighted_data = accumulator.expectation
+        return accumulator.deviation(), {'weighted_data': weighted_data, 'differences': (matrix - weighted_data[..., None, :]) ** 2}
+
+    @staticmethod
+    def mse_mod(matrix, probabilities, value_type):
+        # Отклонение от максимального (непрерывная величина) или среднего (дискретная) ожидаемого значения
+        accumulator = UncertaintyKernels.__accumulate__(matrix, probabilities)
+        result, dump = UncertaintyKernels.mse_mod_moments(accumulator, value_type)
+        weighted_data = dump['weighted_data']
+        center = weighted_data.max(axis=-1, keepdims=True) if value_type == 'непрерывная' else weighted_data.mean(axis=-1, keepdims=True)
+        return result, {'weighted_data': weighted_data, 'differences': (matrix - center[..., None, :]) ** 2}
+
+    @staticmethod
+    def probability_maximizing(matrix, probabilities, threshold):
+        states_probability_with_condition = (matrix >= threshold) * UncertaintyKernels.__weights__(probabilities)
+        return states_probability_with_condition.sum(axis=-2), {'states_probability_with_condition': states_probability_with_condition}
+
+    @staticmethod
+    def modal(matrix, probabilities):
+        probabilities = np.asarray(probabilities, dtype=float)
+        best_states = probabilities == probabilities.max(axis=-1, keepdims=True)
+        result = (matrix * best_states[..., :, None]).sum(axis=-2) / best_states.sum(axis=-1)[..., None]
+        return result, {'best_states': best_states}
+
+    @staticmethod
+    def entropy(matrix, probabilities):
+        # Для неположительных значений матрица отражается относительно максимума с небольшим запасом
+        condition = (matrix > 0).all(axis=(-2, -1))
+        max_value = matrix.max(axis=(-2, -1)) + matrix.max(axis=(-2, -1)) * 10**-4
+        fixed_data = np.where(condition[..., None, None], matrix, max_value[..., None, None] - matrix)
+
+        weighted_matrix = UncertaintyKernels.__weights__(probabilities) * fixed_data
+        weighted_matrix = weighted_matrix / weighted_matrix.sum(axis=-2, keepdims=True)
+        # 0 * log(0) считается нулем
+        result = -(weighted_matrix * np.log2(np.where(weighted_matrix > 0, weighted_matrix, 1))).sum(axis=-2)
+
+        return result.max(axis=-1, keepdims=True) - result, {'condition': condition, 'max_value': max_value, 'fixed_data': fixed_data, 'weighted_matrix': weighted_matrix}
+
+    @staticmethod
+    def hermeyer(matrix, probabilities):
+        condition = (matrix < 0).all(axis=(-2, -1))
+        max_value = matrix.max(axis=(-2, -1)) + matrix.max(axis=(-2, -1)) * 10**-4
+        fixed_data = np.where(condition[..., None, None], matrix, matrix - max_value[..., None, None])
+
+        result = (UncertaintyKernels.__weights__(probabilities) * fixed_data).min(axis=-2)
+        return result, {'condition': condition, 'max_value': max_value, 'fixed_data': fixed_data}
+
+    """Ситуация 2: Неопределенность"""
+    @staticmethod
+    def vald(matrix, probabilities=None):
+        return matrix.min(axis=-2), {}
+
+    @staticmethod
+    def minmax_savage(matrix, probabilities=None):
+        penalty_matrix = matrix.max(axis=-1, keepdims=True) - matrix
+        result = penalty_matrix.max(axis=-2)
+        return result.max(axis=-1, keepdims=True) - result, {'penalty_matrix': penalty_matrix}
+
+    """Ситуация 3: Риск"""
+    @staticmethod
+    def hurwicz(matrix, probabilities, risk_attitude):
+        return (1 - risk_attitude) * matrix.max(axis=-2) + risk_attitude * matrix.min(axis=-2), {}
+
+    @staticmethod
+    def hodges_lehman(matrix, probabilities, hl_parameter):
+        return UncertaintyKernels.hodges_lehman_moments(UncertaintyKernels.__accumulate__(matrix, probabilities), hl_parameter)
+
+    @staticmethod
+    def additional(matrix, probabilities, additional_param):
+        return UncertaintyKernels.additional_moments(UncertaintyKernels.__accumulate__(matrix, probabilities), additional_param)
+
+    @staticmethod
+    def universal(matrix, probabilities, additional_param, risk_attitude, trust_level):
+        # Без вероятностей состояний остается только критерий Гурвица, иначе все составляющие берутся из одного прохода
+        if probabilities is None:
+            return UncertaintyKernels.hurwicz(matrix, probabilities, risk_attitude)[0], {}
+        return UncertaintyKernels.universal_moments(UncertaintyKernels.__accumulate__(matrix, probabilities), additional_param, risk_attitude, trust_level)
+
+    """Оценки по накопленным характеристикам"""
+    # Используются, когда состояния не заданы таблицей, а генерируются по частям
+    @staticmethod
+    def bayes_laplace_moments(accumulator):
+        return accumulator.expectation, {'weighted_data': accumulator.expectation}
+
+    @staticmethod
+    def mse_mod_moments(accumulator, value_type):
+        weighted_data = accumulator.expectation
+        center = weighted_data.max(axis=-1, keepdims=True) if value_type == 'непрерывная' else weighted_data.mean(axis=-1, keepdims=True)
+        result = accumulator.deviation(center)
+        return result.max(axis=-1, keepdims=True) - result, {'weighted_data': weighted_data, 'sigma_data': result}
+
+    @staticmethod
+    def probability_maximizing_moments(accumulator, threshold):
+        return accumulator.exceedance_probability, {}
+
+    @staticmethod
+    def vald_moments(accumulator):
+        return accumulator.min, {'min_data': accumulator.min}
+
+    @staticmethod
+    def minmax_savage_moments(accumulator):
+        return accumulator.regret.max(axis=-1, keepdims=True) - accumulator.regret, {'regret': accumulator.regret}
+
+    @staticmethod
+    def hurwicz_moments(accumulator, risk_attitude):
+        return (1 - risk_attitude) * accumulator.max + risk_attitude * accumulator.min, {}
+
+    @staticmethod
+    def hodges_lehman_moments(accumulator, hl_parameter):
+        return hl_parameter * accumulator.expectation + (1 - hl_parameter) * accumulator.min, {'weighted_data': accumulator.expectation, 'min_data': accumulator.min}
+
+    @staticmethod
+    def additional_moments(accumulator, additional_param):
+        sigma_data = accumulator.deviation()
+        return (1 - additional_param) * accumulator.expectation - additional_param * sigma_data, {'weighted_data': accumulator.expectation, 'sigma_data': sigma_data}
+
+    @staticmethod
+    def universal_moments(accumulator, additional_param, risk_attitude, trust_level):
+        gurcvitz_criteria, _ = UncertaintyKernels.hurwicz_moments(accumulator, risk_attitude)
+        additional_criteria, additional_dump = UncertaintyKernels.additional_moments(accumulator, additional_param)
+        result = (1 - trust_level) * additional_criteria + trust_level * gurcvitz_criteria
+        return result, {'gurcvitz_criteria': gurcvitz_criteria, 'additional_criteria': additional_criteria, **additional_dump}
+
+    """Верхняя огибающая"""
+    @staticmethod
+    def upper_envelope(intercepts, slopes, tolerance=10**-12):
+        # Значения альтернатив линейны по параметру: intercepts + slopes * t, t из [0, 1];
+        # возвращает интервалы [начало, конец, индекс альтернативы], на которых максимум достигается одной альтернативой
+        intercepts = np.asarray(intercepts, dtype=float)
+        slopes = np.asarray(slopes, dtype=float)
+
+        # При равенстве в начале интервала лучшей остается альтернатива с большим наклоном
+        leaders = np.flatnonzero(intercepts >= intercepts.max() - tolerance)
+        best = leaders[np.argmax(slopes[leaders])]
+
+        intervals = []
+        start = 0.0
+        while True:
+            steeper = slopes > slopes[best] + tolerance
+            crossing = np.full(len(slopes), np.inf)
+            crossing[steeper] = (intercepts[best] - intercepts[steeper]) / (slopes[steeper] - slopes[best])
+            crossing = np.maximum(crossing, start)
+
+            end = min(crossing.min(), 1.0)
+            if end > start or not intervals:
+                intervals.append([start, end, int(best)])
+            if end >= 1.0:
+                break
+
+            leaders = np.flatnonzero(steeper & (crossing <= end + tolerance))
+            best = leaders[np.argmax(slopes[leaders])]
+            start = end
+
+        return intervals
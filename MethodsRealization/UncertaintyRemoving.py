@@ -1,12 +1,90 @@
 import pandas as pd
 import numpy as np
-from math import log
 from copy import copy
 
+from MethodsRealization.Normalization import Normalization
+from MethodsRealization.ChunkedProcessing import ChunkedProcessing
+from MethodsRealization.UncertaintyKernels import UncertaintyKernels, ScenarioAccumulator
+
 
 class UncertaintyRemoving: 
-    def  __init__(self, certain_data, uncertain_data, uncertainty_settings, uncertainty_methods, normalization_methods, direcion_settings):
+    natural_zero_range = 'max'      # Естественная нормализация критерия с одинаковыми значениями делит на максимум
+
+    # Ядро, его параметры и состав дампа (ключ, вид значения) для каждого метода снятия неопределенности
+    uncertainty_kernels = {
+        '__BayesLaplace__': ('bayes_laplace', [], [('result', 'result')]),
+        '__MSE__': ('mse', [], [('weighted_data', 'row'), ('differences', 'states'), ('result', 'result')]),
+        '__MSE_mod__': ('mse_mod', ['value_type'], [('value_type', 'param'), ('weighted_data', 'row'), ('differences', 'states'), ('result', 'result')]),
+        '__probability_maximizing__': ('probability_maximizing', ['threshold'], [('threshold', 'param'), ('states_probability_with_condition', 'states'), ('result', 'result')]),
+        '__modal__': ('modal', [], [('best_states', 'states_list'), ('result', 'result')]),
+        '__entropy__': ('entropy', [], [('condition', 'bool'), ('max_value', 'float'), ('fixed_data', 'states'), ('weighted_matrix', 'states'), ('result', 'result')]),
+        '__Hermeyer__': ('hermeyer', [], [('condition', 'bool'), ('max_value', 'float'), ('fixed_data', 'states'), ('result', 'result')]),
+        '__Vald__': ('vald', [], [('result', 'result')]),
+        '__MinMaxSevidzh__': ('minmax_savage', [], [('penalty_matrix', 'states'), ('result', 'result')]),
+        '__Gurvic__': ('hurwicz', ['risk_attitude'], [('result', 'result'), ('risk_attitude', 'param')]),
+        '__HodgesLehman__': ('hodges_lehman', ['hl_parameter'], [('hl_parameter', 'param'), ('weighted_data', 'row0'), ('min_data', 'row0'), ('result', 'result')]),
+        '__additional_criterion__': ('additional', ['additional_param'], [('additional_param', 'param'), ('weighted_data', 'row'), ('sigma_data', 'row'), ('result', 'result')]),
+        '__universal_criterion__': ('universal', ['additional_param', 'risk_attitude', 'trust_level'], [
+            ('additional_param', 'param'), ('risk_attitude', 'param'), ('trust_level', 'param'), ('gurcvitz_criteria', 'row'),
+            ('weighted_data', 'row'), ('sigma_data', 'row'), ('additional_criteria', 'row'), ('result', 'result')
+        ])
+    }
+    matrix_parameters = ['threshold']   # Параметры, сравниваемые со всей матрицей состояний, а не с вектором альтернатив
+
+    # Методы, оцениваемые по накопленным характеристикам выборки сценариев
+    sampled_kernels = {
+        '__BayesLaplace__': ('bayes_laplace_moments', []),
+        '__MSE_mod__': ('mse_mod_moments', ['value_type']),
+        '__probability_maximizing__': ('probability_maximizing_moments', ['threshold']),
+        '__Vald__': ('vald_moments', []),
+        '__MinMaxSevidzh__': ('minmax_savage_moments', []),
+        '__Gurvic__': ('hurwicz_moments', ['risk_attitude']),
+        '__HodgesLehman__': ('hodges_lehman_moments', ['hl_parameter']),
+        '__universal_criterion__': ('universal_moments', ['additional_param', 'risk_attitude', 'trust_level'])
+    }
+    # Параметры универсального критерия, фиксированные ситуацией априорной информированности
+    universal_fixed_parameters = {
+        'Ситуация 1: Полная определенность': {'trust_level': 0.0, 'risk_attitude': 0.0},
+        'Ситуация 2: Неопределенность': {'trust_level': 1.0, 'additional_param': 0.0}
+    }
+    # Параметры критериев, от которых значения альтернатив зависят линейно
+    sweep_parameters = {
+        '__Gurvic__': ['risk_attitude'],
+        '__HodgesLehman__': ['hl_parameter'],
+        '__universal_criterion__': ['additional_param', 'risk_attitude', 'trust_level']
+    }
+    sampling_default_params = {
+        'samples': 100000,
+        'chunk_size': 10000,
+        'seed': None
+    }
+
+    # Методы снятия неопределенности, допустимые в каждой ситуации априорной информированности
+    situation_methods = {
+        'Ситуация 1: Полная определенность': {
+            'Критерий Байеса-Лапласа': '__BayesLaplace__',
+            'Критерий минимальной среднеквадратичной ошибки': '__MSE_mod__',
+            'Критерий максимальной вероятности': '__probability_maximizing__',
+            'Модальный критерий': '__modal__',
+            'Критерий минимума энтропии': '__entropy__',
+            'Критерий Гермейера': '__Hermeyer__',
+            'Универсальный критерий': '__universal_criterion__'
+        },
+        'Ситуация 2: Неопределенность': {
+            'Критерий Вальда': '__Vald__',
+            'Критерий минимаксного Сэвиджа': '__MinMaxSevidzh__',
+            'Универсальный критерий': '__universal_criterion__'
+        },
+        'Ситуация 3: Риск': {
+            'Критерий Гурвица': '__Gurvic__',
+            'Критерий Ходжеса-Лемана': '__HodgesLehman__',
+            'Универсальный критерий': '__universal_criterion__'
+        }
+    }
+
+    def  __init__(self, certain_data, uncertain_data, uncertainty_settings, uncertainty_methods, normalization_methods, direcion_settings, samplers=None):
         self.uncertain_data = uncertain_data
+        self.samplers = dict() if samplers is None else samplers   # Неопределенные критерии, заданные генератором сценариев
         self.certain_data = certain_data
         self.uncertainty_settings = uncertainty_settings
         self.uncertainty_methods = uncertainty_methods
@@ -19,6 +97,8 @@ class UncertaintyRemoving:
         savige_max_value = self.direcion_settings['savige_max_values']
 
         for criterion in direction_changes:
+            if criterion in self.samplers:
+                continue
             if direction_changes[criterion] == 'negation':
                 if criterion in self.uncertain_data:
                     self.uncertain_data[criterion] = (-1) * self.uncertain_data[criterion]
@@ -33,348 +113,316 @@ class UncertaintyRemoving:
                 raise ValueError("Некорректный способ смены направления")
 
     """Нормализация критериев"""    
-    def __relative__(self, data):
-        if isinstance(data, pd.DataFrame):
-            value = (abs(data.max().max()) if data.max().max() > 0.0  else abs(data.min().min()) if data.max().max() < 0.0 
-                        else abs(data.min().min()) if data.min().min() != 0.0 else data.max().max() + 10**(-6))
-        else: 
-            value = (abs(data.max()) if data.max() > 0.0  else abs(data.min()) if data.max() < 0.0 
-                        else abs(data.min()) if data.min() != 0.0 else data.max() + 10**(-6))
-        return data.div(value)
-    
-    def __comparative__(self, data):
-        if isinstance(data, pd.DataFrame):
-            return data.sub(data.min().min())
-        else:
-            return data.sub(data.min())
-    
-    def __natural__(self, data):
-        if isinstance(data, pd.DataFrame):
-            value = data.max().max() - data.min().min() if data.max().max() - data.min().min() != 0 else data.max().max() if data.max().max() != 0 else data.max().max() + 10**(-6)
-        else:
-            value = data.max() - data.min() if data.max() - data.min() != 0 else data.max() if data.max() != 0 else data.max() + 10**(-6)
-        return data.div(value)
-
-    def __full__(self, data):
-        if isinstance(data, pd.DataFrame):
-            min_value = data.min().min()
-            value = data.max().max() - data.min().min() if data.max().max() - data.min().min() != 0 else data.max().max() if data.max().max() != 0 else data.max().max() + 10**(-6)
-        else:
-            min_value = data.min()
-            value = data.max() - data.min() if data.max() - data.min() != 0 else data.max() if data.max() != 0 else data.max() + 10**(-6)
-        return data.sub(min_value).div(value)
-
     def __uncertain_criterion_normalize__(self):
+        # Неопределенный критерий нормализуется по всей матрице состояний
         for criterion in self.uncertain_data:
-            if self.normalization_methods[criterion] == 'Относительная нормализация':
-                self.uncertain_data[criterion] = self.__relative__(self.uncertain_data[criterion])
-            elif self.normalization_methods[criterion] == 'Сравнительная нормализация':                
-                self.uncertain_data[criterion] = self.__comparative__(self.uncertain_data[criterion])
-            elif self.normalization_methods[criterion] == 'Естественная нормализация':
-                self.uncertain_data[criterion] = self.__natural__(self.uncertain_data[criterion])
-            elif self.normalization_methods[criterion] == 'Полная нормализация':
-                self.uncertain_data[criterion] = self.__full__(self.uncertain_data[criterion])
-            elif self.normalization_methods[criterion] == "Нет нормализации":
-                pass
-            else:
-                raise ValueError("Некорректный метод нормализации")
-            
-            threshold_value = self.uncertain_data[criterion].max().max() * 10 ** (-4)
-            self.uncertain_data[criterion] = self.uncertain_data[criterion].mask(self.uncertain_data[criterion].abs() <= threshold_value, threshold_value)
-            print(self.uncertain_data[criterion])
+            values = Normalization.normalize(self.uncertain_data[criterion].to_numpy(dtype=float), self.normalization_methods[criterion], axis=None, zero_range=self.natural_zero_range)
+            self.uncertain_data[criterion] = pd.DataFrame(Normalization.floor(values, axis=None, absolute=True), index=self.uncertain_data[criterion].index, columns=self.uncertain_data[criterion].columns)
     
     def __certain_criterion_normalize__(self):
-        for criterion in self.certain_data.index:
-            if self.normalization_methods[criterion] == 'Относительная нормализация':
-                self.certain_data.loc[criterion] = self.__relative__(self.certain_data.loc[criterion])
-            elif self.normalization_methods[criterion] == 'Сравнительная нормализация':                
-                self.certain_data.loc[criterion] = self.__comparative__(self.certain_data.loc[criterion])
-            elif self.normalization_methods[criterion] == 'Естественная нормализация':
-                self.certain_data.loc[criterion] = self.__natural__(self.certain_data.loc[criterion])
-            elif self.normalization_methods[criterion] == 'Полная нормализация':
-                self.certain_data.loc[criterion] = self.__full__(self.certain_data.loc[criterion])
-            elif self.normalization_methods[criterion] == "Нет нормализации":
-                pass
-            else:
-                raise ValueError("Некорректный метод нормализации")
-            
-        self.certain_data = self.certain_data.apply(lambda row: row.mask(row.abs() <= row.max() * 10**(-4), row.max() * 10**(-4)), axis=1)
-        #print(self.certain_data)
+        values = Normalization.normalize_rows(self.certain_data.to_numpy(dtype=float), [self.normalization_methods[criterion] for criterion in self.certain_data.index], zero_range=self.natural_zero_range)
+        self.certain_data = pd.DataFrame(Normalization.floor(values, axis=1, absolute=True), index=self.certain_data.index, columns=self.certain_data.columns)
 
     def __normalize__(self):
         self.__uncertain_criterion_normalize__()
         self.__certain_criterion_normalize__()
 
     """Снятие неопределенности"""
-    def __BayesLaplace__(self, criterion, probabilities):
-        result = pd.DataFrame(self.uncertain_data[criterion].mul(pd.Series(probabilities), axis=0).sum()).T
-        result.index = [criterion]
+    def __probabilities__(self, criterion, probabilities):
+        # Вероятности состояний в порядке строк матрицы критерия
+        return pd.Series(probabilities, dtype=float).reindex(self.uncertain_data[criterion].index, fill_value=0.0).to_numpy()
+
+    def __row__(self, criterion, values, index=None):
+        return pd.DataFrame([values], index=[criterion] if index is None else index, columns=self.uncertain_data[criterion].columns)
+
+    def __states_frame__(self, criterion, values):
+        return pd.DataFrame(values, index=self.uncertain_data[criterion].index, columns=self.uncertain_data[criterion].columns)
+
+    def __dump__(self, criterion, dump_spec, result, kernel_dump, parameters):
+        dump = {}
+        for key, kind in dump_spec:
+            if kind == 'result':
+                dump[key] = result
+            elif kind == 'param':
+                dump[key] = parameters[key]
+            elif key not in kernel_dump:
+                continue
+            elif kind == 'row':
+                dump[key] = self.__row__(criterion, kernel_dump[key])
+            elif kind == 'row0':
+                dump[key] = self.__row__(criterion, kernel_dump[key], index=[0])
+            elif kind == 'states':
+                dump[key] = self.__states_frame__(criterion, kernel_dump[key])
+            elif kind == 'states_list':
+                dump[key] = list(self.uncertain_data[criterion].index[kernel_dump[key]])
+            elif kind == 'bool':
+                dump[key] = bool(kernel_dump[key])
+            elif kind == 'float':
+                dump[key] = float(kernel_dump[key])
+        return dump
+
+    def __batched_removing__(self, method, criteria, parameters):
+        # Критерии группы (один метод и число состояний) складываются в массив критерии x состояния x альтернативы
+        kernel, kernel_parameters, dump_spec = self.uncertainty_kernels[method]
+
+        matrices = np.stack([self.uncertain_data[criterion].to_numpy(dtype=float) for criterion in criteria])
+        probabilities = None
+        if parameters[criteria[0]].get('probabilities') is not None:
+            probabilities = np.stack([self.__probabilities__(criterion, parameters[criterion]['probabilities']) for criterion in criteria])
+
+        # Числовые параметры критериев группы - столбцы, строковые одинаковы внутри группы
+        kernel_arguments = {}
+        for name in kernel_parameters:
+            values = [parameters[criterion][name] for criterion in criteria]
+            if isinstance(values[0], str):
+                kernel_arguments[name] = values[0]
+            else:
+                kernel_arguments[name] = np.array(values, dtype=float).reshape((-1, 1, 1) if name in self.matrix_parameters else (-1, 1))
 
-        return result, {'result': result}
+        result, kernel_dump = getattr(UncertaintyKernels, kernel)(matrices, probabilities, **kernel_arguments)
 
-    def __MSE__(self, criterion, probabilities, value_type):
-        
-        weighted_data = pd.DataFrame(self.uncertain_data[criterion].mul(pd.Series(probabilities), axis=0).sum()).T
-        weighted_data.index = [criterion]
+        dumps = []
+        for i, criterion in enumerate(criteria):
+            criterion_dump = {key: value[i] for key, value in kernel_dump.items()}
+            dumps.append(self.__dump__(criterion, dump_spec, self.__row__(criterion, result[i]), criterion_dump, parameters[criterion]))
 
-        differences = self.uncertain_data[criterion].sub(weighted_data.iloc[criterion]).pow(2)
+        return result, dumps
 
-        result = pd.DataFrame(differences.mul(pd.Series(probabilities), axis=0).sum()).T.pow(0.5)
-        result.index = [criterion]
+    def __single_removing__(self, method, criterion, **parameters):
+        result, dumps = self.__batched_removing__(method, [criterion], {criterion: parameters})
+        return dumps[0]['result'], dumps[0]
 
-        dump = {
-            'weighted_data': weighted_data,
-            'differences': differences, 
-            'result': result
-        }
+    def __BayesLaplace__(self, criterion, probabilities):
+        return self.__single_removing__('__BayesLaplace__', criterion, probabilities=probabilities)
 
-        return result, dump
+    def __MSE__(self, criterion, probabilities, value_type):
+        return self.__single_removing__('__MSE__', criterion, probabilities=probabilities, value_type=value_type)
 
     def __MSE_mod__(self, criterion, probabilities, value_type):
-        
-        weighted_data = pd.DataFrame(self.uncertain_data[criterion].mul(pd.Series(probabilities), axis=0).sum()).T
-        weighted_data.index = [criterion]
-
-        differences = self.uncertain_data[criterion].sub(weighted_data.max(axis=1).loc[criterion] if value_type == 'непрерывная' else weighted_data.mean(axis=1).loc[criterion]).pow(2)
-
-        result = pd.DataFrame(differences.mul(pd.Series(probabilities), axis=0).sum()).T.pow(0.5)
-        result = result.max().max() - result
-        result.index = [criterion]
-
-        dump = {
-            'value_type': value_type,
-            'weighted_data': weighted_data,
-            'differences': differences, 
-            'result': result
-        }
-
-        return result, dump
+        return self.__single_removing__('__MSE_mod__', criterion, probabilities=probabilities, value_type=value_type)
 
     def __probability_maximizing__(self, criterion, probabilities, threshold):
-
-        states_probability_with_condition = (self.uncertain_data[criterion] >= threshold).mul(pd.Series(probabilities), axis=0)
-        result = pd.DataFrame(states_probability_with_condition.sum()).T
-        result.index = [criterion]
-        
-        dump = {
-            'threshold': threshold,
-            'states_probability_with_condition': states_probability_with_condition,
-            'result': result
-        }
-
-        return result, dump
+        return self.__single_removing__('__probability_maximizing__', criterion, probabilities=probabilities, threshold=threshold)
 
     def __modal__(self, criterion, probabilities):
-        best_states = [state for state, value in probabilities.items() if value == max(probabilities.values())]
-
-        result = pd.DataFrame(self.uncertain_data[criterion].loc[best_states].mean()).T
-        result.index = [criterion]
-
-        dump = {
-            'best_states': best_states,
-            'result': result
-        }
-
-        return result, dump
+        return self.__single_removing__('__modal__', criterion, probabilities=probabilities)
 
     def __entropy__(self, criterion, probabilities):
-        condition = (self.uncertain_data[criterion] > 0).all().all()
-        max_value = self.uncertain_data[criterion].max().max() + self.uncertain_data[criterion].max().max() * 10 ** (-4)
-        matrix = self.uncertain_data[criterion] if condition else self.uncertain_data[criterion].apply(lambda x: max_value - x)
-
-        weighted_matrix = matrix.mul(pd.Series(probabilities), axis=0).div(matrix.mul(pd.Series(probabilities), axis=0).sum())
-        result = pd.DataFrame((weighted_matrix * weighted_matrix.apply(lambda x: x.apply(lambda y: log(y,2)))).mul(-1).sum()).T
-        result = result.max().max() - result
-        result.index = [criterion]
-
-        dump = {
-            'condition': condition,
-            'max_value': max_value,
-            'fixed_data': matrix,
-            'weighted_matrix': weighted_matrix,
-            'result': result
-        }
-        return result, dump
+        return self.__single_removing__('__entropy__', criterion, probabilities=probabilities)
 
     def __Hermeyer__(self, criterion, probabilities):
-        condition = (self.uncertain_data[criterion] < 0).all().all()
-        max_value = self.uncertain_data[criterion].max().max() + self.uncertain_data[criterion].max().max() * 10 ** (-4)
-        matrix = self.uncertain_data[criterion] if condition else self.uncertain_data[criterion].apply(lambda x: x - max_value)
-        
-        result = pd.DataFrame((matrix).mul(pd.Series(probabilities), axis=0).min()).T
-        result.index = [criterion]
-
-        dump = {
-            'condition': condition,
-            'max_value': max_value,
-            'fixed_data': matrix,
-            'result': result
-        }
-        return result, dump
+        return self.__single_removing__('__Hermeyer__', criterion, probabilities=probabilities)
 
     def __Vald__(self, criterion): 
-        result = pd.DataFrame(self.uncertain_data[criterion].min()).T
-        result.index = [criterion]
-
-        return result, {'result': result}
+        return self.__single_removing__('__Vald__', criterion)
 
     def __MinMaxSevidzh__(self, criterion):
-        penalty_matrix = self.uncertain_data[criterion].apply(lambda x: self.uncertain_data[criterion].max(axis=1) - x)
-
-        result = pd.DataFrame(penalty_matrix.max()).T
-        result = result.max().max() - result
-        result.index = [criterion]
-
-        dump = {
-            'penalty_matrix': penalty_matrix,
-            'result': result
-        }
-
-        return result, dump
+        return self.__single_removing__('__MinMaxSevidzh__', criterion)
 
     def __Gurvic__(self, criterion, probabilities, risk_attitude):
-        result = pd.DataFrame((1 - risk_attitude) * self.uncertain_data[criterion].max() + risk_attitude * self.uncertain_data[criterion].min()).T
-        result.index = [criterion]
-
-        return result, {'result': result, 'risk_attitude': risk_attitude}
+        return self.__single_removing__('__Gurvic__', criterion, probabilities=probabilities, risk_attitude=risk_attitude)
 
     def __HodgesLehman__(self, criterion, probabilities, hl_parameter):
-        weighted_data = pd.DataFrame(self.uncertain_data[criterion].mul(pd.Series(probabilities), axis=0).sum()).T
-        min_data = pd.DataFrame(self.uncertain_data[criterion].min()).T
-
-        result = hl_parameter * weighted_data + (1 - hl_parameter) * min_data
-        result.index = [criterion]
-
-        dump = {
-            'hl_parameter': hl_parameter,
-            'weighted_data': weighted_data,
-            'min_data': min_data,
-            'result': result
-        }
-
-        return result, dump
+        return self.__single_removing__('__HodgesLehman__', criterion, probabilities=probabilities, hl_parameter=hl_parameter)
 
     def __additional_criterion__(self, criterion, probabilities, additional_param):
-        weighted_data = pd.DataFrame(self.uncertain_data[criterion].mul(pd.Series(probabilities), axis=0).sum()).T
-        weighted_data.index = [criterion]
-        
-        sigma_data = pd.DataFrame(self.uncertain_data[criterion].sub(weighted_data.iloc[0]).pow(2).mul(pd.Series(probabilities), axis=0).sum()).T.pow(0.5)
-        #sigma_data = self.__MSE_mod__(criterion, probabilities, 'дискретная')[0]
-        sigma_data.index = [criterion]
-
-        result = (1 - additional_param) * weighted_data - additional_param * sigma_data
-        result.index = [criterion]
-
-        dump = {
-            'additional_param': additional_param,
-            'weighted_data': weighted_data,
-            'sigma_data': sigma_data,
-            'result': result
-        }
-
-        return result, dump
+        return self.__single_removing__('__additional_criterion__', criterion, probabilities=probabilities, additional_param=additional_param)
 
     def __universal_criterion__(self, criterion, probabilities, additional_param, risk_attitude, trust_level):
-        gurcvitz_criteria, dump_gur = self.__Gurvic__(criterion, probabilities, risk_attitude)
-
-        if probabilities is None:
-            dump_gur['trust_level'] = trust_level
-            dump_gur['additional_param'] = additional_param
-            return gurcvitz_criteria, dump_gur
-        
-        additional_criteria, dump_add = self.__additional_criterion__(criterion, probabilities, additional_param)
-        result = (1 - trust_level) * additional_criteria + trust_level * gurcvitz_criteria
-        result.index = [criterion]
-
-        dump = {
-            'additional_param': additional_param, 
-            'risk_attitude': risk_attitude,
-            'trust_level': trust_level,
-            'gurcvitz_criteria': gurcvitz_criteria,
-            'weighted_data': dump_add['weighted_data'],
-            'sigma_data': dump_add['sigma_data'],
-            'additional_criteria': additional_criteria,
-            'result': result
-        }
-
-        return result, dump
+        return self.__single_removing__('__universal_criterion__', criterion, probabilities=probabilities, additional_param=additional_param, risk_attitude=risk_attitude, trust_level=trust_level)
     
-    def __get_parameters__(self):
+    def __get_parameters__(self, criteria=None):
+        criteria = list(self.uncertain_data) if criteria is None else criteria
         parameters = {
             criterion: {
                 'criterion': criterion,
                 **self.uncertainty_methods[criterion]['parameters']
             }
-            for criterion in self.uncertain_data
+            for criterion in criteria
         }
 
-        for criterion in self.uncertain_data:
+        for criterion in criteria:
             situation = self.uncertainty_methods[criterion]['situation_type']
-            if situation in ['Ситуация 1: Полная определенность', 'Ситуация 3: Риск']:
+            if criterion in self.samplers:
+                # Вероятности сценариев задаются самим генератором
+                pass
+            elif situation in ['Ситуация 1: Полная определенность', 'Ситуация 3: Риск']:
                 parameters[criterion]['probabilities'] = self.uncertainty_settings['probabilities'][criterion]
             elif self.uncertainty_methods[criterion]['method_name'] == 'Универсальный критерий':                
                 parameters[criterion]['probabilities'] = None
             if self.uncertainty_methods[criterion]['method_name'] == 'Универсальный критерий':
-                if situation == 'Ситуация 1: Полная определенность':
-                    parameters[criterion]['trust_level'] = 0.0
-                    parameters[criterion]['risk_attitude'] = 0.0
-                if situation == 'Ситуация 2: Неопределенность':
-                    parameters[criterion]['trust_level'] = 1.0
-                    parameters[criterion]['additional_param'] = 0.0
+                parameters[criterion].update(self.universal_fixed_parameters.get(situation, {}))
 
         return parameters
 
     def __uncertainty_removing__(self):
         related_information = {}
-        result_string = {}
+        criteria = list(self.uncertain_data)
 
         parameters = self.__get_parameters__()
-        #print(parameters)
 
+        # Критерии с одинаковым методом, числом состояний и строковыми параметрами считаются одним вызовом ядра
+        groups = {}
+        for criterion in criteria:
+            method = self.__criterion_method__(criterion)
+            key = (
+                method,
+                len(self.uncertain_data[criterion].index),
+                parameters[criterion].get('probabilities') is None,
+                tuple((name, value) for name, value in parameters[criterion].items() if isinstance(value, str) and name != 'criterion')
+            )
+            groups.setdefault(key, []).append(criterion)
+
+        alternatives = self.uncertain_data[criteria[0]].columns if criteria else self.certain_data.columns
+        result = np.empty((len(criteria), len(alternatives)))
+        positions = {criterion: i for i, criterion in enumerate(criteria)}
+
+        for (method, *_), group in groups.items():
+            group_result, dumps = self.__batched_removing__(method, group, parameters)
+            result[[positions[criterion] for criterion in group]] = group_result
+            related_information.update(zip(group, dumps))
+
+        return pd.DataFrame(result, index=criteria, columns=alternatives), {criterion: related_information[criterion] for criterion in criteria}
+    
+    """Анализ параметров критериев"""
+    def __criterion_method__(self, criterion):
+        situation = self.uncertainty_settings['prior_information'][criterion]
+        if situation not in self.situation_methods:
+            raise ValueError("Некорректная ситуация априорной информированности")
+        if self.uncertainty_methods[criterion]['method_name'] not in self.situation_methods[situation]:
+            raise ValueError("Некорректный метод снятия неопределенности")
+        return self.situation_methods[situation][self.uncertainty_methods[criterion]['method_name']]
+
+    def __swept_parameters__(self, criterion):
+        # Параметры, фиксированные ситуацией, на значения критерия не влияют (в ситуации 2 остается только критерий Гурвица)
+        method = self.__criterion_method__(criterion)
+        fixed = self.universal_fixed_parameters.get(self.uncertainty_methods[criterion]['situation_type'], {}) if method == '__universal_criterion__' else {}
+        return [parameter for parameter in self.sweep_parameters.get(method, []) if parameter not in fixed]
+
+    def parameter_sweep(self, criterion, parameter, grid=None):
+        # Значения критерия на сетке параметра из [0, 1] одним расчетом и точные интервалы, где лучшая альтернатива не меняется
+        method = self.__criterion_method__(criterion)
+        if criterion not in self.uncertain_data or parameter not in self.__swept_parameters__(criterion):
+            raise ValueError("Некорректный параметр для анализа")
+
+        kernel, kernel_parameters, _ = self.uncertainty_kernels[method]
+        parameters = self.__get_parameters__([criterion])[criterion]
+        matrix = self.uncertain_data[criterion].to_numpy(dtype=float)
+        probabilities = None if parameters.get('probabilities') is None else self.__probabilities__(criterion, parameters['probabilities'])
+
+        def evaluate(values):
+            arguments = {name: parameters[name] for name in kernel_parameters}
+            arguments[parameter] = np.asarray(values, dtype=float)[:, None]
+            return getattr(UncertaintyKernels, kernel)(matrix, probabilities, **arguments)[0]
+
+        grid = np.linspace(0.0, 1.0, 101) if grid is None else np.asarray(grid, dtype=float)
+        values = evaluate(grid)
+
+        # Критерий линеен по параметру: прямая задается значениями на концах отрезка
+        ends = evaluate([0.0, 1.0])
+        alternatives = self.uncertain_data[criterion].columns
+        intervals = UncertaintyKernels.upper_envelope(ends[0], ends[1] - ends[0])
+
+        return pd.DataFrame(values, index=pd.Index(grid, name=parameter), columns=alternatives), pd.DataFrame(
+            [[start, end, alternatives[best]] for start, end, best in intervals],
+            columns=['Начало', 'Конец', 'Лучшая альтернатива']
+        )
+
+    def __parameter_sweeps__(self):
+        sweeps = {}
         for criterion in self.uncertain_data:
-            if self.uncertainty_settings['prior_information'][criterion] == 'Ситуация 1: Полная определенность':
-                if self.uncertainty_methods[criterion]['method_name'] == 'Критерий Байеса-Лапласа':
-                    result_string[criterion], related_information[criterion] = self.__BayesLaplace__(**parameters[criterion])
-                elif self.uncertainty_methods[criterion]['method_name'] == 'Критерий минимальной среднеквадратичной ошибки':
-                    result_string[criterion], related_information[criterion] = self.__MSE_mod__(**parameters[criterion])
-                elif self.uncertainty_methods[criterion]['method_name'] == 'Критерий максимальной вероятности':
-                    result_string[criterion], related_information[criterion] = self.__probability_maximizing__(**parameters[criterion])
-                elif self.uncertainty_methods[criterion]['method_name'] == 'Модальный критерий':
-                    result_string[criterion], related_information[criterion] = self.__modal__(**parameters[criterion])
-                elif self.uncertainty_methods[criterion]['method_name'] == 'Критерий минимума энтропии':
-                    result_string[criterion], related_information[criterion] = self.__entropy__(**parameters[criterion])
-                elif self.uncertainty_methods[criterion]['method_name'] == 'Критерий Гермейера':
-                    result_string[criterion], related_information[criterion] = self.__Hermeyer__(**parameters[criterion])
-                elif self.uncertainty_methods[criterion]['method_name'] == 'Универсальный критерий':
-                    result_string[criterion], related_information[criterion] = self.__universal_criterion__(**parameters[criterion])
-                else:
-                    raise ValueError("Некорректный метод снятия неопределенности")
-            elif self.uncertainty_settings['prior_information'][criterion] == 'Ситуация 2: Неопределенность':
-                if self.uncertainty_methods[criterion]['method_name'] == 'Критерий Вальда':
-                    result_string[criterion], related_information[criterion] = self.__Vald__(**parameters[criterion])
-                elif self.uncertainty_methods[criterion]['method_name'] == 'Критерий минимаксного Сэвиджа':
-                    result_string[criterion], related_information[criterion] = self.__MinMaxSevidzh__(**parameters[criterion])
-                elif self.uncertainty_methods[criterion]['method_name'] == 'Универсальный критерий':
-                    result_string[criterion], related_information[criterion] = self.__universal_criterion__(**parameters[criterion])
-                else:
-                    raise ValueError("Некорректный метод снятия неопределенности")
-            elif self.uncertainty_settings['prior_information'][criterion] == 'Ситуация 3: Риск':
-                if self.uncertainty_methods[criterion]['method_name'] == 'Критерий Гурвица':
-                    result_string[criterion], related_information[criterion] = self.__Gurvic__(**parameters[criterion])
-                elif self.uncertainty_methods[criterion]['method_name'] == 'Критерий Ходжеса-Лемана':
-                    result_string[criterion], related_information[criterion] = self.__HodgesLehman__(**parameters[criterion])
-                elif self.uncertainty_methods[criterion]['method_name'] == 'Универсальный критерий':
-                    result_string[criterion], related_information[criterion] = self.__universal_criterion__(**parameters[criterion])
-                else:
-                    raise ValueError("Некорректный метод снятия неопределенности")
+            for parameter in self.__swept_parameters__(criterion):
+                values, intervals = self.parameter_sweep(criterion, parameter)
+                sweeps.setdefault(criterion, {})[parameter] = {'values': values, 'intervals': intervals}
+        return sweeps
+
+    """Снятие неопределенности по выборке сценариев"""
+    def __alternatives__(self):
+        if len(self.certain_data.columns) > 0:
+            return self.certain_data.columns
+        return next(iter(self.uncertain_data.values())).columns
+
+    def __scenarios__(self, criterion, sampling_params, seed):
+        # Генератор: функция (rng, size) -> массив сценарии x альтернативы или словарь с именем распределения numpy и его параметрами
+        sampler = self.samplers[criterion]
+        rng = np.random.default_rng(seed)
+        alternatives_number = len(self.__alternatives__())
+
+        for start in range(0, sampling_params['samples'], sampling_params['chunk_size']):
+            size = min(sampling_params['chunk_size'], sampling_params['samples'] - start)
+            if callable(sampler):
+                values = sampler(rng, size)
             else:
-                raise ValueError("Некорректная ситуация априорной информированности")
-            
-        
-        return pd.concat([result_string[criterion] for criterion in result_string]), related_information
-    
+                spec = dict(sampler)
+                distribution = spec.pop('distribution')
+                values = getattr(rng, distribution)(size=(size, alternatives_number), **spec)
+            yield np.array(values, dtype=float)
+
+    def __sampled_direction_changing__(self, criterion, values):
+        direction_changes = self.direcion_settings['direction_changes']
+        if criterion not in direction_changes:
+            return values
+        if direction_changes[criterion] == 'negation':
+            return -values
+        elif direction_changes[criterion] == 'savige':
+            return self.direcion_settings['savige_max_values'][criterion] - values
+        raise ValueError("Некорректный способ смены направления")
+
+    def __sampled_removing__(self, criterion, method, parameters, sampling_params):
+        # Сценарии генерируются дважды с одним зерном: первый проход дает границы для нормализации, второй - накопленные характеристики
+        seed = np.random.SeedSequence().entropy if sampling_params['seed'] is None else sampling_params['seed']
+        normalization_method = self.normalization_methods[criterion]
+
+        min_value, max_value = np.inf, -np.inf
+        for values in self.__scenarios__(criterion, sampling_params, seed):
+            min_value, max_value = min(min_value, values.min()), max(max_value, values.max())
+
+        min_value, max_value, normalized_max = Normalization.bounds_statistics(
+            min_value, max_value, [normalization_method],
+            direction_changing=lambda bounds: self.__sampled_direction_changing__(criterion, bounds),
+            zero_range=self.natural_zero_range
+        )
+        statistics = (min_value, max_value)
+
+        accumulator = ScenarioAccumulator(threshold=parameters.get('threshold'))
+        for values in self.__scenarios__(criterion, sampling_params, seed):
+            values = self.__sampled_direction_changing__(criterion, values)
+            values = Normalization.normalize(values, normalization_method, axis=None, zero_range=self.natural_zero_range, statistics=statistics)
+            accumulator.update(Normalization.floor(values, axis=None, absolute=True, max_value=normalized_max))
+
+        kernel, kernel_parameters = self.sampled_kernels[method]
+        result, kernel_dump = getattr(UncertaintyKernels, kernel)(accumulator, **{name: parameters[name] for name in kernel_parameters})
+
+        alternatives = self.__alternatives__()
+        result = pd.DataFrame([result], index=[criterion], columns=alternatives)
+        dump = {
+            **{name: parameters[name] for name in kernel_parameters},
+            **{key: pd.DataFrame([value], index=[criterion], columns=alternatives) for key, value in kernel_dump.items()},
+            'samples': sampling_params['samples'],
+            'seed': seed,
+            'result': result
+        }
+        return result, dump
+
+    def __sampled_uncertainty_removing__(self, sampling_params=None):
+        sampling_params = {**self.sampling_default_params, **({} if sampling_params is None else sampling_params)}
+        criteria = list(self.samplers)
+        parameters = self.__get_parameters__(criteria)
+
+        results = []
+        related_information = {}
+        for criterion in criteria:
+            method = self.__criterion_method__(criterion)
+            if method not in self.sampled_kernels:
+                raise ValueError("Метод снятия неопределенности не поддерживает задание выборкой сценариев")
+
+            result, related_information[criterion] = self.__sampled_removing__(criterion, method, parameters[criterion], sampling_params)
+            results.append(result)
+
+        return pd.concat(results), related_information
+
     """Обработка данных"""
-    def get_processed_data(self):
+    def get_processed_data(self, sampling_params=None):
         related_information = {
             "uncertainty_removing": {}
         }
@@ -393,8 +441,18 @@ class UncertaintyRemoving:
 
         generalized_certain_ratings, related_information["uncertainty_removing"]["data"] = self.__uncertainty_removing__()
         related_information["uncertainty_removing"]["methods"] = self.uncertainty_methods
+        related_information["uncertainty_removing"]["sweeps"] = self.__parameter_sweeps__()
         
+        if self.samplers:
+            sampled_ratings, sampled_information = self.__sampled_uncertainty_removing__(sampling_params)
+            related_information["uncertainty_removing"]["data"].update(sampled_information)
+            generalized_certain_ratings = pd.concat([generalized_certain_ratings, sampled_ratings])
+
         evaluating_alternatives = pd.concat([self.certain_data, generalized_certain_ratings])
         related_information['result_criterions_values'] = evaluating_alternatives
 
         return evaluating_alternatives, related_information
+
+    def get_processed_blocks(self, blocks):
+        # Обработка детерминированных критериев по частям, blocks - функция, возвращающая итератор блоков альтернатив
+        return ChunkedProcessing(blocks, self.normalization_methods, self.direcion_settings, zero_range=self.natural_zero_range, absolute_floor=True).get_processed_blocks()
@@ -174,13 +174,17 @@ class ReportCalculation:
             file.write(f"КРИТЕРИЙ. {criterion}\n\n")
             if reduction_methods[criterion] == "Усреднение с оценкой компетентности экспертов по алгоритму Евланова-Кутузова":
                 file.write("История оценки компетентности экспертов\n")
-                for i, comp in enumerate(related_reduction_info[criterion]):
-                    file.write(f"\tШаг {i}. {''.join([f'{expert}: {comp[expert]}   'for expert in comp])}\n")
+                for i, comp in related_reduction_info[criterion]['K'].iterrows():
+                    file.write(f"\tШаг {i}. {''.join([f'{expert}: {comp[expert]}   'for expert in comp.index])}\n")
+                if not related_reduction_info[criterion]['converged']:
+                    file.write(f"\tАлгоритм не сошелся за {related_reduction_info[criterion]['iterations']} итераций\n")
                 file.write("\n")
             elif reduction_methods[criterion] == "Усреднение с оценкой компетентности экспертов по алгоритму Рыкова":
                 file.write("История оценки компетентности экспертов\n")
-                for i, comp in enumerate(related_reduction_info[criterion]):
-                    file.write(f"\tШаг {i}. {''.join([f'{expert}: {comp[expert]}   'for expert in comp])}\n")
+                for i, comp in related_reduction_info[criterion]['K'].iterrows():
+                    file.write(f"\tШаг {i}. {''.join([f'{expert}: {comp[expert]}   'for expert in comp.index])}\n")
+                if not related_reduction_info[criterion]['converged']:
+                    file.write(f"\tАлгоритм не сошелся за {related_reduction_info[criterion]['iterations']} итераций\n")
                 file.write("\n")
             elif reduction_methods[criterion] == "Обобщенная ранжировка":
                 file.write(f"Рассчитывается {'медианная' if related_reduction_info[criterion]['mode'] == 'median' else 'усредненная'} метрика\n")
@@ -192,7 +196,11 @@ class ReportCalculation:
                 file.write("Расстояния между ранжировками экспертов: \n")
                 for distance in related_reduction_info[criterion]['distances']:
                     file.write(f"\tРасстояния между оценками {distance[0]} и {distance[1]} составляет {distance[2]:.3f}\n")
-                file.write(f"\nОптимальной является оценка эксперта {related_reduction_info[criterion]['expert']}\n\n")
+                if related_reduction_info[criterion]['consensus'] == 'kemeny':
+                    file.write(f"\nОбобщенная ранжировка{'' if related_reduction_info[criterion]['exact'] else ' (приближенная)'}: {' > '.join(str(alter) for alter in related_reduction_info[criterion]['ranking'])}\n")
+                    file.write(f"Суммарное расстояние до ранжировок экспертов составляет {related_reduction_info[criterion]['distance']:.3f}\n\n")
+                else:
+                    file.write(f"\nОптимальной является оценка эксперта {related_reduction_info[criterion]['expert']}\n\n")
             elif reduction_methods[criterion] == "Усреднение экспертных оценок":
                 file.write("Значения критерия по экспертам усреднены\n\n")
 
@@ -276,7 +284,7 @@ class ReportCalculation:
         quasiequal_info = self.related_information_optimizing_task1['qequal']
 
         file.write("Взвешенные значения критериев\n")
-        file.write(tabulate(equal_info["weighted_values"], headers='keys', tablefmt='simple', showindex=True))
+        file.write(tabulate(DecisionMaking.render_pairwise_differences(equal_info["weighted_values"]), headers='keys', tablefmt='simple', showindex=True))
         file.write("\n\n")
 
         file.write("Допустимые отклонения для пар взвешенных значений критериев:\n")
@@ -301,6 +309,8 @@ class ReportCalculation:
         file.write("Взвешенные значения критериев\n")
         distances_table = absolute_info['data_with_common_criterion']
         distances_table.loc[relative_info['data_with_common_criterion'].index[-1]] = relative_info['data_with_common_criterion'].loc[relative_info['data_with_common_criterion'].index[-1]]
+        if relative_info['data_with_common_criterion'].loc['Взвешенное произведение критериев'].isna().any():
+            distances_table.loc['Логарифм модуля взвешенного произведения критериев'] = relative_info['log_weighted_products']
         file.write(tabulate(distances_table, headers='keys', tablefmt='simple', showindex=True))
         file.write("\n\n")
 
@@ -341,7 +351,7 @@ class ReportCalculation:
 
         for criterion in eq_lex_info['criterions_history']:
             file.write(f"\tОтсечение по критерию {criterion}\n")
-            file.write(tabulate(eq_lex_info['criterions_history'][criterion], headers='keys', tablefmt='simple', showindex=True))
+            file.write(tabulate(DecisionMaking.criterions_history_view(eq_lex_info, criterion), headers='keys', tablefmt='simple', showindex=True))
             file.write("\n\n")
 
         optimal_alternatives = "нет оптимальных альтернатив" if len(eq_lex_info['optimal_alternatives']) == 0 else ', '.join(eq_lex_info['optimal_alternatives'])
@@ -360,7 +370,7 @@ class ReportCalculation:
 
         for criterion in quasi_eq_lex_info['criterions_history']:
             file.write(f"\tОтсечение по критерию {criterion}\n")
-            file.write(tabulate(quasi_eq_lex_info['criterions_history'][criterion], headers='keys', tablefmt='simple', showindex=True))
+            file.write(tabulate(DecisionMaking.criterions_history_view(quasi_eq_lex_info, criterion), headers='keys', tablefmt='simple', showindex=True))
             file.write("\n")
 
         optimal_alternatives = "нет оптимальных альтернатив" if len(quasi_eq_lex_info['optimal_alternatives']) == 0 else ', '.join(quasi_eq_lex_info['optimal_alternatives'])
@@ -372,7 +382,7 @@ class ReportCalculation:
         file.write("-" * 80 + "\n\n")
 
         optimal_alt = self.related_information_optimizing_task1['optimal_alternatives']
-        file.write(tabulate(self.related_information_optimizing_task1['result'], headers='keys', tablefmt='simple', showindex=True))
+        file.write(tabulate(DecisionMaking.render_result(self.related_information_optimizing_task1['membership']), headers='keys', tablefmt='simple', showindex=True))
         optimal_alternatives = "нет оптимальных альтернатив" if len(optimal_alt) == 0 else ', '.join(optimal_alt)
         
         file.write("\n\n" + "-" * 80 + "\n")
@@ -535,6 +545,27 @@ class ReportCalculation:
 
         removing_methods = self.related_information_preprocessing_task2["uncertainty_removing"]["methods"]
         related_removing_info = self.related_information_preprocessing_task2["uncertainty_removing"]["data"]
+        removing_sweeps = self.related_information_preprocessing_task2["uncertainty_removing"].get("sweeps", {})
+        sweep_parameter_names = {
+            'risk_attitude': 'Степень склонности ЛПР к риску',
+            'hl_parameter': 'Параметр кр. Ходжеса-Лемана',
+            'additional_param': 'Параметр дополнительного критерия',
+            'trust_level': 'Уровень доверия'
+        }
+        # Для критериев, заданных выборкой сценариев, выводятся накопленные характеристики вместо таблиц по состояниям
+        sampled_parameter_names = {
+            'value_type': 'Тип величины',
+            'threshold': 'Порог значений критерия',
+            **sweep_parameter_names
+        }
+        sampled_table_names = {
+            'weighted_data': 'Ожидаемые значения',
+            'sigma_data': 'Отклонения',
+            'min_data': 'Минимумы значений критерия',
+            'regret': 'Максимальные сожаления',
+            'gurcvitz_criteria': 'Значения критерия Гурвица',
+            'additional_criteria': 'Значения дополнительного критерия'
+        }
 
         uncertainty_settings = self.second_task_data['uncertainty_settings']
         uncertainty_probabilities = uncertainty_settings['probabilities']
@@ -543,7 +574,24 @@ class ReportCalculation:
         for criterion in removing_methods:
             file.write(f"КРИТЕРИЙ. {criterion}\n")
             #print(removing_methods[criterion])
-            if removing_methods[criterion]['method_name'] == 'Критерий Байеса-Лапласа':
+            if 'samples' in related_removing_info[criterion]:
+                sampled_info = related_removing_info[criterion]
+                file.write(f"\tСитуация априорной информированности. {uncertainty_methods[criterion]['situation_type']}\n")
+                file.write(f"\tМетод снятия неопределенности. {uncertainty_methods[criterion]['method_name']}\n")
+                file.write(f"\tСостояния среды заданы выборкой сценариев: {sampled_info['samples']} (зерно генератора {sampled_info['seed']})\n")
+                for parameter, name in sampled_parameter_names.items():
+                    if parameter in sampled_info:
+                        file.write(f"\t{name}: {sampled_info[parameter]}\n")
+                file.write("\n")
+
+                for key, name in sampled_table_names.items():
+                    if key in sampled_info:
+                        file.write(f"{name}:\n")
+                        file.write(tabulate(sampled_info[key], headers='keys', tablefmt='simple', showindex=True))
+                        file.write("\n\n")
+                file.write("\n")
+
+            elif removing_methods[criterion]['method_name'] == 'Критерий Байеса-Лапласа':
                 file.write(f"\tСитуация априорной информированности. {uncertainty_methods[criterion]['situation_type']}\n")
                 file.write(f"\tМетод снятия неопределенности. {uncertainty_methods[criterion]['method_name']}\n")
                 if len(uncertainty_probabilities[criterion]) > 0:
@@ -694,6 +742,11 @@ class ReportCalculation:
                 else:
                     file.write(f"\nРасчитано значение критерия Гурвица\n\n\n")
 
+            for parameter, sweep in removing_sweeps.get(criterion, {}).items():
+                file.write(f"Интервалы параметра '{sweep_parameter_names[parameter]}', на которых лучшая альтернатива не меняется:\n")
+                file.write(tabulate(sweep['intervals'], headers='keys', tablefmt='simple', showindex=False, floatfmt='.4f'))
+                file.write("\n\n")
+
         file.write("Результат снятия неопределенности:\n")        
         file.write(tabulate(self.related_information_preprocessing_task2["result_criterions_values"], headers='keys', tablefmt='simple', showindex=True))
         file.write("\n\n")
@@ -941,7 +994,13 @@ class ReportCalculation:
         elif task_type == 'Принятие решения на основе нечетких систем':
             file.write("Степени соответствия альтернатив после дефаззификации:\n")
             file.write(tabulate(self.processing_data_task3['data_with_measure'], headers='keys', tablefmt='simple', showindex=True))
-            file.write("\n\n\n\n")
+            file.write("\n\n")
+            if self.processing_data_task3.get('inference_deviation') is not None:
+                file.write(f"Наибольшее отклонение от расчета через integrate.quad: {self.processing_data_task3['inference_deviation']:.2e}")
+                if not self.processing_data_task3['inference_within_tolerance']:
+                    file.write(" (превышает допустимое)")
+                file.write("\n")
+            file.write("\n\n")
         
         """Результаты применения нечеткой логики"""
         file.write("-" * 80 + "\n")